@@ -5,12 +5,44 @@ import datetime
 import hashlib
 import json
 import logging
+import os
+import signal
+import sys
+import threading
+import time
 import uuid
 from argparse import ArgumentParser
-from http.server import BaseHTTPRequestHandler, HTTPServer
-
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler
+from typing import Optional
+
+from bloom import ClientFilter
+from breaker import BreakerStore, CircuitOpen
+from capture import Capture
+from compress import (
+    DEFAULT_LEVEL,
+    DEFAULT_MIN_SIZE,
+    IDENTITY,
+    decompress,
+    encode_body,
+)
 from descriptor import Field
-from scoring import get_interests, get_score
+from listeners import describe, make_server, notify_ready, reexec, sd_notify
+from memprof import profiler
+from pagination import PAGE_SIZE, paginate
+from registry import (
+    MethodOverloaded,
+    MethodRegistry,
+    MethodTimeout,
+)
+from scheduler import BULK, PriorityScheduler
+from scoring import get_interests, get_interests_many, get_score
+from sharding import ShardedStore
+from shmcache import SharedCache, SharedCacheStore
+from snapshot import Snapshotter, load
+from store import Store
+from tracing import REQUEST_ID, TracedStore, span, tracer
+from writebehind import OVERFLOW_POLICIES, WriteBehindCache
 
 SALT = "Otus"
 ADMIN_LOGIN = "admin"
@@ -21,12 +53,16 @@ FORBIDDEN = 403
 NOT_FOUND = 404
 INVALID_REQUEST = 422
 INTERNAL_ERROR = 500
+SERVICE_UNAVAILABLE = 503
+GATEWAY_TIMEOUT = 504
 ERRORS = {
     BAD_REQUEST: "Bad Request",
     FORBIDDEN: "Forbidden",
     NOT_FOUND: "Not Found",
     INVALID_REQUEST: "Invalid Request",
     INTERNAL_ERROR: "Internal Server Error",
+    SERVICE_UNAVAILABLE: "Service Unavailable",
+    GATEWAY_TIMEOUT: "Gateway Timeout",
 }
 UNKNOWN = 0
 MALE = 1
@@ -36,6 +72,17 @@ GENDERS = {
     MALE: "male",
     FEMALE: "female",
 }
+CLIENT_FILTER = None
+SCHEDULER = None
+INTERESTS_WORKERS = 2
+INTERESTS_FANOUT = 16
+INTERESTS_TIMEOUT = 10
+INTERESTS_PAGE_SIZE = PAGE_SIZE
+INTERESTS_FROM_STORE = False
+INTERESTS_POOL = ThreadPoolExecutor(
+    max_workers=INTERESTS_WORKERS * INTERESTS_FANOUT,
+    thread_name_prefix="interests",
+)
 
 
 class CharField(Field):
@@ -89,6 +136,7 @@ class ClientIDsField(Field):
 class ClientsInterestsRequest:
     client_ids = ClientIDsField(required=True)
     date = DateField(required=False, nullable=True)
+    cursor = CharField(required=False, nullable=True)
 
 
 class OnlineScoreRequest:
@@ -107,6 +155,18 @@ class OnlineScoreRequest:
         }
 
 
+class MemoryProfileRequest:
+    action = CharField(required=True, nullable=False)
+
+
+class ClientFilterRequest:
+    action = CharField(required=True, nullable=False)
+
+
+class SchedulerRequest:
+    action = CharField(required=True, nullable=False)
+
+
 class MethodRequest:
     account = CharField(required=False, nullable=True)
     login = CharField(required=True, nullable=True)
@@ -151,35 +211,21 @@ def parse_method_request(body):
     return method_request
 
 
-def handle_online_score(method_request, ctx, store):
-    online_score_request = OnlineScoreRequest()
+def handle_online_score(online_score_request, method_request, ctx, store):
+    arguments_list = []
+    for argument in online_score_request.to_dict():
+        if (
+            online_score_request.to_dict()[argument] is None
+            or online_score_request.to_dict()[argument] == ""
+        ):
+            continue
+        arguments_list.append(argument)
+    ctx["has"] = arguments_list[:-1]
 
-    try:
-        online_score_request.phone = method_request.arguments.get("phone", "")
-        online_score_request.email = method_request.arguments.get("email", "")
-        online_score_request.birthday = method_request.arguments.get("birthday", "")
-        online_score_request.gender = method_request.arguments.get("gender", "")
-        online_score_request.first_name = method_request.arguments.get("first_name", "")
-        online_score_request.last_name = method_request.arguments.get("last_name", "")
-
-        arguments_list = []
-        for argument in online_score_request.to_dict():
-            if (
-                online_score_request.to_dict()[argument] is None
-                or online_score_request.to_dict()[argument] == ""
-            ):
-                continue
-            arguments_list.append(argument)
-        ctx["has"] = arguments_list[:-1]
-
-        if not {"phone", "email"}.issubset(set(ctx["has"])):
-            if not {"first_name", "last_name"}.issubset(set(ctx["has"])):
-                if not {"gender", "birthday"}.issubset(set(ctx["has"])):
-                    raise ValueError(ERRORS[INVALID_REQUEST])
-    except TypeError as e:
-        return str(e), INVALID_REQUEST
-    except ValueError as e:
-        return str(e), INVALID_REQUEST
+    if not {"phone", "email"}.issubset(set(ctx["has"])):
+        if not {"first_name", "last_name"}.issubset(set(ctx["has"])):
+            if not {"gender", "birthday"}.issubset(set(ctx["has"])):
+                return ERRORS[INVALID_REQUEST], INVALID_REQUEST
 
     if method_request.is_admin:
         return {"score": 42}, OK
@@ -196,29 +242,118 @@ def handle_online_score(method_request, ctx, store):
     return {"score": score}, OK
 
 
-def handle_clients_interests(method_request, ctx, store):
-    clients_interests_request = ClientsInterestsRequest()
+def handle_clients_interests(clients_interests_request, method_request, ctx, store):
+    ctx["nclients"] = len(clients_interests_request.client_ids)
 
+    client_ids = list(dict.fromkeys(clients_interests_request.client_ids))
     try:
-        clients_interests_request.client_ids = method_request.arguments.get(
-            "client_ids"
+        client_ids, next_cursor = paginate(
+            client_ids, clients_interests_request.cursor, INTERESTS_PAGE_SIZE
         )
-        clients_interests_request.date = method_request.arguments.get("date", None)
-
-        ctx["nclients"] = len(clients_interests_request.client_ids)
-    except TypeError as e:
-        return str(e), INVALID_REQUEST
     except ValueError as e:
         return str(e), INVALID_REQUEST
-
-    clients_interests_dict = {}
-    for client_id in clients_interests_request.client_ids:
-        if client_id in clients_interests_dict:
-            continue
-        clients_interests_dict[client_id] = get_interests(store, client_id)
+    if next_cursor is not None:
+        ctx["next_cursor"] = next_cursor
+
+    clients_interests_dict = dict.fromkeys(client_ids)
+    if CLIENT_FILTER is not None:
+        known = CLIENT_FILTER.might_contain(client_ids)
+        for client_id, found in zip(client_ids, known):
+            if not found:
+                clients_interests_dict[client_id] = []
+        client_ids = [client_id for client_id, found in zip(client_ids, known) if found]
+
+    if INTERESTS_FROM_STORE:
+        interests = get_interests_many(store, client_ids)
+    else:
+        interests = [get_interests(None, client_id) for client_id in client_ids]
+    clients_interests_dict.update(zip(client_ids, interests))
     return clients_interests_dict, OK
 
 
+def handle_memory_profile(memory_profile_request, method_request, ctx, store):
+    if not method_request.is_admin:
+        return ERRORS[FORBIDDEN], FORBIDDEN
+
+    action = memory_profile_request.action
+    if action == "start":
+        profiler.enable()
+    elif action == "stop":
+        profiler.disable()
+    elif action == "reset":
+        profiler.reset()
+    elif action != "report":
+        return "Unknown action: %s" % action, INVALID_REQUEST
+    return profiler.report(), OK
+
+
+def handle_client_filter(client_filter_request, method_request, ctx, store):
+    if not method_request.is_admin:
+        return ERRORS[FORBIDDEN], FORBIDDEN
+    if CLIENT_FILTER is None:
+        return "Client filter is disabled", NOT_FOUND
+
+    action = client_filter_request.action
+    if action == "refresh":
+        CLIENT_FILTER.refresh()
+    elif action != "report":
+        return "Unknown action: %s" % action, INVALID_REQUEST
+    return CLIENT_FILTER.report(), OK
+
+
+def handle_scheduler(scheduler_request, method_request, ctx, store):
+    if not method_request.is_admin:
+        return ERRORS[FORBIDDEN], FORBIDDEN
+    if SCHEDULER is None:
+        return "Scheduler is disabled", NOT_FOUND
+    if scheduler_request.action != "report":
+        return "Unknown action: %s" % scheduler_request.action, INVALID_REQUEST
+    return SCHEDULER.report(), OK
+
+
+METHODS = MethodRegistry()
+METHODS.register(
+    "online_score",
+    OnlineScoreRequest,
+    handle_online_score,
+    workers=8,
+    max_concurrency=32,
+    timeout=1,
+)
+METHODS.register(
+    "clients_interests",
+    ClientsInterestsRequest,
+    handle_clients_interests,
+    workers=INTERESTS_WORKERS,
+    max_concurrency=8,
+    timeout=INTERESTS_TIMEOUT,
+)
+METHODS.register(
+    "memory_profile",
+    MemoryProfileRequest,
+    handle_memory_profile,
+    workers=1,
+    max_concurrency=2,
+    timeout=10,
+)
+METHODS.register(
+    "client_filter",
+    ClientFilterRequest,
+    handle_client_filter,
+    workers=1,
+    max_concurrency=2,
+    timeout=60,
+)
+METHODS.register(
+    "scheduler",
+    SchedulerRequest,
+    handle_scheduler,
+    workers=1,
+    max_concurrency=2,
+    timeout=1,
+)
+
+
 def method_handler(request, ctx, store):
     response = {}
     code = OK
@@ -227,38 +362,97 @@ def method_handler(request, ctx, store):
     method = body.get("method")
 
     try:
-        method_request = parse_method_request(body)
+        with span("parse"):
+            method_request = parse_method_request(body)
 
-        if not check_auth(method_request):
+        with span("check_auth"):
+            authorized = check_auth(method_request)
+        if not authorized:
             return ERRORS[FORBIDDEN], FORBIDDEN
 
-        method_request.validate()
+        with span("validate"):
+            method_request.validate()
     except ValueError as e:
         return str(e), INVALID_REQUEST
 
-    if method == "online_score":
-        return handle_online_score(method_request, ctx, store)
+    spec = METHODS.get(method)
+    if spec is None:
+        return response, code
 
-    if method == "clients_interests":
-        return handle_clients_interests(method_request, ctx, store)
+    try:
+        with span("validate_arguments", method=method):
+            arguments_request = spec.parse(method_request.arguments)
+    except (TypeError, ValueError) as e:
+        return str(e), INVALID_REQUEST
+
+    return dispatch(spec, arguments_request, method_request, ctx, store)
 
-    return response, code
+
+def dispatch(spec, arguments_request, method_request, ctx, store):
+    scheduler = SCHEDULER
+    if scheduler is not None:
+        priority = scheduler.classify(
+            spec.name, method_request.account, method_request.is_admin
+        )
+        with span("queue"):
+            if not scheduler.acquire(priority):
+                return ERRORS[SERVICE_UNAVAILABLE], SERVICE_UNAVAILABLE
+    try:
+        with span(spec.name):
+            return spec.submit(arguments_request, method_request, ctx, store)
+    except (MethodOverloaded, CircuitOpen):
+        return ERRORS[SERVICE_UNAVAILABLE], SERVICE_UNAVAILABLE
+    except MethodTimeout:
+        return ERRORS[GATEWAY_TIMEOUT], GATEWAY_TIMEOUT
+    finally:
+        if scheduler is not None:
+            scheduler.release()
 
 
 class MainHTTPHandler(BaseHTTPRequestHandler):
     router = {"method": method_handler}
-    store = None
+    store: Optional[TracedStore] = None
+    compress_level = DEFAULT_LEVEL
+    compress_min_size = DEFAULT_MIN_SIZE
+    capture: Optional[Capture] = None
+
+    def address_string(self):
+        if isinstance(self.client_address, tuple):
+            return super().address_string()
+        return "unix"
 
     def get_request_id(self, headers):
-        return headers.get("HTTP_X_REQUEST_ID", uuid.uuid4().hex)
+        return headers.get("X-Request-Id") or uuid.uuid4().hex
 
     def do_POST(self):
+        if not profiler.enabled:
+            return self.handle_post()
+        with profiler.request():
+            return self.handle_post()
+
+    def handle_post(self):
+        request_id = self.get_request_id(self.headers)
+        request_id_token = REQUEST_ID.set(request_id)
+        try:
+            self.respond(request_id)
+        finally:
+            REQUEST_ID.reset(request_id_token)
+
+    def respond(self, request_id):
+        started, start = time.time(), time.monotonic()
         response, code = {}, OK
-        context = {"request_id": self.get_request_id(self.headers)}
+        context = {"request_id": request_id}
         request = None
         try:
-            data_string = self.rfile.read(int(self.headers["Content-Length"]))
-            request = json.loads(data_string)
+            with span("read_body"):
+                data_string = self.rfile.read(int(self.headers["Content-Length"]))
+                data_string = decompress(
+                    data_string, self.headers.get("Content-Encoding")
+                )
+            with span("json_decode"):
+                request = json.loads(data_string)
+            if profiler.enabled:
+                profiler.set_method(request.get("method"))
         except:
             code = BAD_REQUEST
 
@@ -276,16 +470,40 @@ class MainHTTPHandler(BaseHTTPRequestHandler):
             else:
                 code = NOT_FOUND
 
-        self.send_response(code)
-        self.send_header("Content-Type", "application/json")
-        self.end_headers()
         if code not in ERRORS:
             r = {"response": response, "code": code}
+            if "next_cursor" in context:
+                r["next_cursor"] = context["next_cursor"]
         else:
             r = {"error": response or ERRORS.get(code, "Unknown Error"), "code": code}
         context.update(r)
         logging.info(context)
-        self.wfile.write(json.dumps(r).encode("utf-8"))
+        with span("encode"):
+            data, encoding = encode_body(
+                json.dumps(r).encode("utf-8"),
+                self.headers.get("Accept-Encoding"),
+                self.compress_level,
+                self.compress_min_size,
+            )
+        with span("write", code=code):
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.send_header("Vary", "Accept-Encoding")
+            self.send_header("X-Request-Id", context["request_id"])
+            if encoding != IDENTITY:
+                self.send_header("Content-Encoding", encoding)
+            self.end_headers()
+            self.wfile.write(data)
+        if self.capture is not None and request:
+            self.capture.record(
+                started,
+                time.monotonic() - start,
+                self.path,
+                request,
+                code,
+                context["request_id"],
+            )
         return
 
 
@@ -293,17 +511,216 @@ if __name__ == "__main__":
     parser = ArgumentParser()
     parser.add_argument("-p", "--port", action="store", type=int, default=8080)
     parser.add_argument("-l", "--log", action="store", default=None)
+    parser.add_argument(
+        "--compress-level", action="store", type=int, default=DEFAULT_LEVEL
+    )
+    parser.add_argument(
+        "--compress-min-size", action="store", type=int, default=DEFAULT_MIN_SIZE
+    )
+    parser.add_argument("--cache-max-pending", action="store", type=int, default=10000)
+    parser.add_argument(
+        "--cache-flush-interval", action="store", type=float, default=0.5
+    )
+    parser.add_argument(
+        "--cache-overflow", choices=OVERFLOW_POLICIES, default=OVERFLOW_POLICIES[0]
+    )
+    parser.add_argument("--unix-socket", action="store", default=None)
+    parser.add_argument("--listen-fd", action="store", type=int, default=None)
+    parser.add_argument("--ready-fd", action="store", type=int, default=None)
+    parser.add_argument(
+        "--interests-fanout", action="store", type=int, default=INTERESTS_FANOUT
+    )
+    parser.add_argument(
+        "--interests-page-size", action="store", type=int, default=PAGE_SIZE
+    )
+    parser.add_argument("--capture", action="store", default=None)
+    parser.add_argument(
+        "--capture-sample-rate", action="store", type=float, default=1.0
+    )
+    parser.add_argument("--memprof", action="store_true", default=False)
+    parser.add_argument("--memprof-dump", action="store", default=None)
+    parser.add_argument("--store-nodes", action="store", type=int, default=1)
+    parser.add_argument("--interests-from-store", action="store_true", default=False)
+    parser.add_argument("--client-filter", action="store_true", default=False)
+    parser.add_argument(
+        "--client-filter-fp-rate", action="store", type=float, default=0.01
+    )
+    parser.add_argument(
+        "--client-filter-refresh", action="store", type=float, default=300
+    )
+    parser.add_argument("--cache-snapshot", action="store", default=None)
+    parser.add_argument(
+        "--cache-snapshot-interval", action="store", type=float, default=60
+    )
+    parser.add_argument("--scheduler-slots", action="store", type=int, default=0)
+    parser.add_argument(
+        "--scheduler-starvation-age", action="store", type=float, default=1.0
+    )
+    parser.add_argument("--scheduler-timeout", action="store", type=float, default=10.0)
+    parser.add_argument(
+        "--bulk-account", action="append", dest="bulk_accounts", default=[]
+    )
+    parser.add_argument("--drain-timeout", action="store", type=float, default=30.0)
+    parser.add_argument("--handoff-timeout", action="store", type=float, default=30.0)
+    parser.add_argument("--trace", action="store", default=None)
+    parser.add_argument("-w", "--workers", action="store", type=int, default=1)
+    parser.add_argument("--shm-slots", action="store", type=int, default=65536)
+    parser.add_argument("--shm-slot-size", action="store", type=int, default=256)
     args = parser.parse_args()
+    if args.client_filter and not args.interests_from_store:
+        parser.error("--client-filter requires --interests-from-store")
+    tracer.configure(args.trace)
+    INTERESTS_FANOUT = args.interests_fanout
+    INTERESTS_PAGE_SIZE = args.interests_page_size
+    INTERESTS_FROM_STORE = args.interests_from_store
+    INTERESTS_POOL = ThreadPoolExecutor(
+        max_workers=INTERESTS_WORKERS * INTERESTS_FANOUT,
+        thread_name_prefix="interests",
+    )
+    MainHTTPHandler.compress_level = args.compress_level
+    MainHTTPHandler.compress_min_size = args.compress_min_size
     logging.basicConfig(
         filename=args.log,
         level=logging.INFO,
         format="[%(asctime)s] %(levelname).1s %(message)s",
         datefmt="%Y.%m.%d %H:%M:%S",
     )
-    server = HTTPServer(("localhost", args.port), MainHTTPHandler)
-    logging.info("Starting server at %s" % args.port)
+    shared_cache = SharedCache(slots=args.shm_slots, slot_size=args.shm_slot_size)
+    snapshotter = None
+    if args.cache_snapshot:
+        try:
+            loaded = load(shared_cache, args.cache_snapshot)
+        except (OSError, ValueError) as e:
+            logging.exception(
+                "Starting with a cold cache, cannot load %s: %s"
+                % (args.cache_snapshot, e)
+            )
+        else:
+            logging.info(
+                "Loaded %s cache entries from %s" % (loaded, args.cache_snapshot)
+            )
+        snapshotter = Snapshotter(
+            shared_cache, args.cache_snapshot, args.cache_snapshot_interval
+        )
+    server = make_server(
+        MainHTTPHandler,
+        port=args.port,
+        unix_socket=args.unix_socket,
+        listen_fd=args.listen_fd,
+    )
+    parent = True
+    children: list[int] = []
+    for _ in range(args.workers - 1):
+        pid = os.fork()
+        if pid == 0:
+            parent, children = False, []
+            if args.ready_fd is not None:
+                os.close(args.ready_fd)
+            break
+        children.append(pid)
+    store_nodes = {"node%s" % i: Store() for i in range(max(args.store_nodes, 1))}
+    write_behind = WriteBehindCache(
+        ShardedStore(
+            {name: BreakerStore(node) for name, node in store_nodes.items()},
+            executor=INTERESTS_POOL,
+            width=INTERESTS_FANOUT,
+            timeout=INTERESTS_TIMEOUT,
+        ),
+        max_pending=args.cache_max_pending,
+        flush_interval=args.cache_flush_interval,
+        overflow=args.cache_overflow,
+    ).start()
+    if args.capture:
+        capture_path = args.capture
+        if args.workers > 1:
+            capture_path = "%s.%s" % (capture_path, os.getpid())
+        MainHTTPHandler.capture = Capture(
+            capture_path, sample_rate=args.capture_sample_rate
+        )
+    MainHTTPHandler.store = TracedStore(SharedCacheStore(write_behind, shared_cache))
+    if snapshotter is not None and parent:
+        snapshotter.start()
+    if args.client_filter:
+        CLIENT_FILTER = ClientFilter(
+            lambda: [
+                int(key[2:]) for node in store_nodes.values() for key in node.keys("i:")
+            ],
+            fp_rate=args.client_filter_fp_rate,
+        )
+        CLIENT_FILTER.refresh().start(args.client_filter_refresh)
+    if args.scheduler_slots > 0:
+        SCHEDULER = PriorityScheduler(
+            args.scheduler_slots,
+            account_classes=dict.fromkeys(args.bulk_accounts, BULK),
+            starvation_age=args.scheduler_starvation_age,
+            timeout=args.scheduler_timeout,
+        )
+    if args.memprof:
+        profiler.enable()
+
+    def shutdown():
+        for pid in children:
+            os.kill(pid, signal.SIGTERM)
+        server.shutdown()
+
+    handing_off = threading.Lock()
+
+    def handoff():
+        # pylint: disable-next=consider-using-with
+        if not handing_off.acquire(blocking=False):
+            return
+        if snapshotter is not None:
+            snapshotter.snapshot()
+        pid = reexec(server, sys.argv, args.handoff_timeout)
+        if pid is None:
+            logging.error(
+                "New server did not start, still serving %s" % describe(server)
+            )
+            handing_off.release()
+            return
+        logging.info("Handed %s over to pid %s" % (describe(server), pid))
+        shutdown()
+
+    def stop(signum, frame):
+        if signum == signal.SIGUSR2:
+            threading.Thread(target=handoff, daemon=True).start()
+            return
+        if parent:
+            sd_notify("STOPPING=1")
+        threading.Thread(target=shutdown, daemon=True).start()
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGUSR2, stop if parent else signal.SIG_IGN)
+    logging.info("Starting server at %s (pid %s)" % (describe(server), os.getpid()))
+    if parent:
+        sd_notify("READY=1\nMAINPID=%s" % os.getpid())
+        if args.ready_fd is not None:
+            notify_ready(args.ready_fd)
     try:
         server.serve_forever()
     except KeyboardInterrupt:
         pass
     server.server_close()
+    logging.info("Draining %s requests (pid %s)" % (server.active, os.getpid()))
+    if not server.drain(args.drain_timeout):
+        logging.warning("Drain timed out with %s requests in flight" % server.active)
+    METHODS.shutdown()
+    INTERESTS_POOL.shutdown()
+    write_behind.close()
+    if CLIENT_FILTER is not None:
+        CLIENT_FILTER.stop()
+    tracer.close()
+    if args.memprof_dump:
+        profiler.dump(
+            "%s.%s" % (args.memprof_dump, os.getpid())
+            if args.workers > 1
+            else args.memprof_dump
+        )
+    if MainHTTPHandler.capture is not None:
+        MainHTTPHandler.capture.close()
+    for pid in children:
+        os.waitpid(pid, 0)
+    if snapshotter is not None and parent:
+        snapshotter.stop()
+    shared_cache.close()
+    logging.shutdown()
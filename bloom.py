@@ -0,0 +1,90 @@
+import hashlib
+import logging
+import math
+import threading
+
+
+class BloomFilter:
+    def __init__(self, capacity, fp_rate=0.01):
+        capacity = max(capacity, 1)
+        self.size = max(int(-capacity * math.log(fp_rate) / math.log(2) ** 2), 8)
+        self.hashes = max(int(round(self.size / capacity * math.log(2))), 1)
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item):
+        digest = hashlib.blake2b(str(item).encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def add(self, item):
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, item):
+        return all(
+            self.bits[position >> 3] & (1 << (position & 7))
+            for position in self._positions(item)
+        )
+
+
+class ClientFilter:  # pylint: disable=too-many-instance-attributes
+    def __init__(self, source, fp_rate=0.01):
+        self.source = source
+        self.fp_rate = fp_rate
+        self.bloom = None
+        self.clients = 0
+        self.checks = 0
+        self.hits = 0
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+        self.thread = None
+
+    def refresh(self):
+        client_ids = list(self.source())
+        bloom = BloomFilter(len(client_ids), self.fp_rate)
+        for client_id in client_ids:
+            bloom.add(client_id)
+        with self.lock:
+            self.bloom = bloom
+            self.clients = len(client_ids)
+        return self
+
+    def might_contain(self, client_ids):
+        bloom = self.bloom
+        if bloom is None:
+            return [True] * len(client_ids)
+        found = [client_id in bloom for client_id in client_ids]
+        with self.lock:
+            self.checks += len(found)
+            self.hits += sum(found)
+        return found
+
+    def report(self):
+        with self.lock:
+            return {
+                "clients": self.clients,
+                "fp_rate": self.fp_rate,
+                "checks": self.checks,
+                "hits": self.hits,
+                "skipped": self.checks - self.hits,
+            }
+
+    def start(self, interval):
+        self.thread = threading.Thread(
+            target=self._run, args=(interval,), name="client-filter", daemon=True
+        )
+        self.thread.start()
+        return self
+
+    def _run(self, interval):
+        while not self.stopped.wait(interval):
+            try:
+                self.refresh()
+            except Exception as e:
+                logging.exception("Client filter refresh failed: %s" % e)
+
+    def stop(self):
+        self.stopped.set()
+        if self.thread is not None:
+            self.thread.join()
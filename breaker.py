@@ -0,0 +1,133 @@
+import threading
+import time
+from collections import OrderedDict, deque
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpen(Exception):
+    pass
+
+
+class CircuitBreaker:  # pylint: disable=too-many-instance-attributes
+    def __init__(
+        self,
+        error_threshold=0.5,
+        latency_threshold=0.5,
+        window=20,
+        min_calls=5,
+        reset_timeout=5,
+        clock=time.monotonic,
+    ):
+        self.error_threshold = error_threshold
+        self.latency_threshold = latency_threshold
+        self.min_calls = min_calls
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.results = deque(maxlen=window)
+        self.state = CLOSED
+        self.opened_at = None
+        self.probing = False
+        self.lock = threading.Lock()
+
+    def allow(self):
+        with self.lock:
+            if self.state == OPEN:
+                if self.clock() - self.opened_at < self.reset_timeout:
+                    return False
+                self.state = HALF_OPEN
+                self.probing = False
+            if self.state == HALF_OPEN:
+                if self.probing:
+                    return False
+                self.probing = True
+            return True
+
+    def record(self, success):
+        with self.lock:
+            if self.state == HALF_OPEN:
+                self.probing = False
+                if success:
+                    self.state = CLOSED
+                    self.results.clear()
+                else:
+                    self._open()
+                return
+            self.results.append(success)
+            if len(self.results) < self.min_calls:
+                return
+            failures = self.results.count(False)
+            if failures / len(self.results) >= self.error_threshold:
+                self._open()
+
+    def _open(self):
+        self.state = OPEN
+        self.opened_at = self.clock()
+        self.results.clear()
+
+    def call(self, func, *args):
+        if not self.allow():
+            raise CircuitOpen("Store circuit is open")
+        start = self.clock()
+        try:
+            result = func(*args)
+        except Exception:
+            self.record(False)
+            raise
+        self.record(self.clock() - start <= self.latency_threshold)
+        return result
+
+
+class BreakerStore:
+    def __init__(self, store, breaker=None, stale_size=10000):
+        self.store = store
+        self.breaker = breaker or CircuitBreaker()
+        self.stale_size = stale_size
+        self.stale = OrderedDict()
+        self.lock = threading.Lock()
+
+    @property
+    def batched(self):
+        return hasattr(self.store, "get_many")
+
+    def get(self, key):
+        return self._load([key], True)[0]
+
+    def get_many(self, keys):
+        return self._load(keys, not self.batched)
+
+    def _fetch(self, keys, single):
+        if single:
+            return [self.store.get(key) for key in keys]
+        return self.store.get_many(keys)
+
+    def _load(self, keys, single):
+        try:
+            values = self.breaker.call(self._fetch, keys, single)
+        except Exception:
+            with self.lock:
+                if all(key in self.stale for key in keys):
+                    return [self.stale[key] for key in keys]
+            raise
+        with self.lock:
+            for key, value in zip(keys, values):
+                self.stale.pop(key, None)
+                self.stale[key] = value
+            while len(self.stale) > self.stale_size:
+                self.stale.popitem(last=False)
+        return values
+
+    def cache_get(self, key):
+        return self.breaker.call(self.store.cache_get, key)
+
+    def cache_set(self, key, value, ttl=None):
+        return self.breaker.call(self.store.cache_set, key, value, ttl)
+
+    def cache_set_many(self, items):
+        if hasattr(self.store, "cache_set_many"):
+            return self.breaker.call(self.store.cache_set_many, items)
+        for key, value, ttl in items:
+            self.cache_set(key, value, ttl)
+        return None
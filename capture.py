@@ -0,0 +1,59 @@
+import json
+import logging
+import random
+from logging.handlers import RotatingFileHandler
+
+REDACTED = "<redacted>"
+
+
+def redact(request):
+    if isinstance(request, dict) and "token" in request:
+        return dict(request, token=REDACTED)
+    return request
+
+
+class Capture:
+    def __init__(self, path, sample_rate=1.0, max_bytes=64 * 1024 * 1024, backups=5):
+        self.sample_rate = sample_rate
+        self.handler = RotatingFileHandler(
+            path, maxBytes=max_bytes, backupCount=backups, encoding="utf-8"
+        )
+        self.handler.setFormatter(logging.Formatter("%(message)s"))
+        self.logger = logging.Logger("capture")
+        self.logger.addHandler(self.handler)
+
+    def sampled(self):
+        return self.sample_rate >= 1 or random.random() < self.sample_rate
+
+    def record(self, ts, duration, path, request, code, request_id=None):
+        if not self.sampled():
+            return
+        body = redact(request)
+        method = body.get("method") if isinstance(body, dict) else None
+        self.logger.info(
+            json.dumps(
+                {
+                    "ts": ts,
+                    "duration": duration,
+                    "path": path,
+                    "method": method,
+                    "request_id": request_id,
+                    "code": code,
+                    "body": body,
+                }
+            )
+        )
+
+    def close(self):
+        self.handler.close()
+
+
+def read_capture(paths):
+    records = []
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    records.append(json.loads(line))
+    records.sort(key=lambda record: record["ts"])
+    return records
@@ -0,0 +1,115 @@
+import gzip
+import io
+import zlib
+
+try:
+    import zstandard  # type: ignore[import-not-found]
+except ImportError:
+    zstandard = None  # type: ignore[assignment]
+
+IDENTITY = "identity"
+GZIP = "gzip"
+ZSTD = "zstd"
+DEFAULT_LEVEL = 6
+DEFAULT_MIN_SIZE = 1024
+MAX_BODY_SIZE = 10 * 1024 * 1024
+
+
+def supported_encodings():
+    if zstandard is not None:
+        return [ZSTD, GZIP]
+    return [GZIP]
+
+
+def parse_accept_encoding(header):
+    weights = {}
+    if not header:
+        return weights
+    for item in header.split(","):
+        parts = item.strip().split(";")
+        name = parts[0].strip().lower()
+        if not name:
+            continue
+        weight = 1.0
+        for param in parts[1:]:
+            key, _, value = param.strip().partition("=")
+            if key.strip() == "q":
+                try:
+                    weight = float(value)
+                except ValueError:
+                    weight = 0.0
+        weights[name] = weight
+    return weights
+
+
+def choose_encoding(accept_encoding):
+    weights = parse_accept_encoding(accept_encoding)
+    best, best_weight = IDENTITY, 0.0
+    for encoding in supported_encodings():
+        weight = weights.get(encoding, weights.get("*", 0.0))
+        if weight > best_weight:
+            best, best_weight = encoding, weight
+    return best
+
+
+def compress(data, encoding, level=DEFAULT_LEVEL):
+    if encoding == GZIP:
+        return gzip.compress(data, compresslevel=level)
+    if encoding == ZSTD and zstandard is not None:
+        return zstandard.ZstdCompressor(level=level).compress(data)
+    if encoding in (IDENTITY, None, ""):
+        return data
+    raise ValueError("Unsupported encoding: %s" % encoding)
+
+
+def gunzip(data, max_size):
+    chunks, size = [], 0
+    while True:
+        decompressor = zlib.decompressobj(wbits=31)
+        chunk = decompressor.decompress(data, max_size + 1 - size)
+        chunks.append(chunk)
+        size += len(chunk)
+        if size > max_size:
+            break
+        if not decompressor.eof:
+            raise ValueError("Truncated gzip body")
+        data = decompressor.unused_data
+        if not data:
+            break
+    return b"".join(chunks)
+
+
+def unzstd(data, max_size):
+    decompressor = zstandard.ZstdDecompressor()
+    source = io.BytesIO(data)
+    with decompressor.stream_reader(source, read_across_frames=True) as reader:
+        body = reader.read(max_size + 1)
+    while len(body) <= max_size and data:
+        frame = decompressor.decompressobj()
+        frame.decompress(data)
+        if not frame.eof:
+            raise ValueError("Truncated zstd body")
+        data = frame.unused_data
+    return body
+
+
+def decompress(data, encoding, max_size=MAX_BODY_SIZE):
+    encoding = (encoding or IDENTITY).strip().lower()
+    if encoding == GZIP:
+        data = gunzip(data, max_size)
+    elif encoding == ZSTD and zstandard is not None:
+        data = unzstd(data, max_size)
+    elif encoding != IDENTITY:
+        raise ValueError("Unsupported encoding: %s" % encoding)
+    if len(data) > max_size:
+        raise ValueError("Body exceeds %s bytes" % max_size)
+    return data
+
+
+def encode_body(data, accept_encoding, level=DEFAULT_LEVEL, min_size=DEFAULT_MIN_SIZE):
+    if len(data) < min_size:
+        return data, IDENTITY
+    encoding = choose_encoding(accept_encoding)
+    if encoding == IDENTITY:
+        return data, IDENTITY
+    return compress(data, encoding, level), encoding
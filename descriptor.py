@@ -1,19 +1,26 @@
 import datetime
 import re
 
+MAX_CLIENT_IDS = 10000
+
 
 class Field:
     def __init__(self, required=True, nullable=False):
         self.required = required
         self.nullable = nullable
-        self._value = None
+        self.name = None
+
+    def __set_name__(self, owner, name):
+        self.name = name
 
     def __get__(self, obj, cls):
-        return self._value
+        if obj is None:
+            return self
+        return obj.__dict__.get(self.name)
 
     def __set__(self, obj, val):
         self.validate(val)
-        self._value = val
+        obj.__dict__[self.name] = val
 
     def check_none(self, val):
         from api import ERRORS, INVALID_REQUEST
@@ -97,6 +104,8 @@ class Field:
             raise TypeError("Field must be a list")
         if len(val) == 0:
             raise ValueError("List cannot be empty")
+        if len(val) > MAX_CLIENT_IDS:
+            raise ValueError("List cannot be longer than %s" % MAX_CLIENT_IDS)
         if not all(isinstance(x, int) for x in val):
             raise TypeError("All list items must be int")
         return val
@@ -0,0 +1,178 @@
+import os
+import select
+import signal
+import socket
+import stat
+import sys
+import threading
+from http.server import HTTPServer, ThreadingHTTPServer
+from socketserver import ThreadingMixIn, UnixStreamServer
+
+SD_LISTEN_FDS_START = 3
+HANDOFF_OPTIONS = ("--listen-fd", "--ready-fd")
+READY = b"1"
+
+
+class DrainingMixIn:
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.active = 0
+        self.idle = threading.Condition()
+
+    def process_request(self, request, client_address):
+        with self.idle:
+            self.active += 1
+        try:
+            super().process_request(request, client_address)
+        except Exception:
+            self.done()
+            raise
+
+    def process_request_thread(self, request, client_address):
+        try:
+            super().process_request_thread(request, client_address)
+        finally:
+            self.done()
+
+    def done(self):
+        with self.idle:
+            self.active -= 1
+            if not self.active:
+                self.idle.notify_all()
+
+    def drain(self, timeout=None):
+        with self.idle:
+            return self.idle.wait_for(lambda: not self.active, timeout)
+
+
+class TCPHTTPServer(DrainingMixIn, ThreadingHTTPServer):
+    pass
+
+
+class UnixHTTPServer(DrainingMixIn, ThreadingMixIn, UnixStreamServer):
+    daemon_threads = True
+    owner = None
+
+    def server_bind(self):
+        UnixStreamServer.server_bind(self)
+        self.owner = os.getpid()
+        self.server_name = "localhost"
+        self.server_port = 0
+
+    def server_close(self):
+        super().server_close()
+        if self.owner == os.getpid() and os.path.exists(self.server_address):
+            os.unlink(self.server_address)
+
+
+def systemd_listen_fd():
+    if os.environ.get("LISTEN_PID") != str(os.getpid()):
+        return None
+    if int(os.environ.get("LISTEN_FDS", "0")) < 1:
+        return None
+    return SD_LISTEN_FDS_START
+
+
+def remove_stale_socket(path):
+    try:
+        mode = os.stat(path).st_mode
+    except FileNotFoundError:
+        return
+    if not stat.S_ISSOCK(mode):
+        raise ValueError("Not a socket: %s" % path)
+    os.unlink(path)
+
+
+def from_fd(fd, handler):
+    sock = socket.socket(fileno=fd)
+    if sock.family == socket.AF_UNIX:
+        server = UnixHTTPServer(sock.getsockname(), handler, bind_and_activate=False)
+    else:
+        server = TCPHTTPServer(sock.getsockname()[:2], handler, bind_and_activate=False)
+    server.socket.close()
+    server.socket = sock
+    return server
+
+
+def make_server(handler, host="localhost", port=8080, unix_socket=None, listen_fd=None):
+    if listen_fd is None:
+        listen_fd = systemd_listen_fd()
+    if listen_fd is not None:
+        return from_fd(listen_fd, handler)
+    if unix_socket:
+        remove_stale_socket(unix_socket)
+        return UnixHTTPServer(unix_socket, handler)
+    return TCPHTTPServer((host, port), handler)
+
+
+def describe(server):
+    if isinstance(server, HTTPServer):
+        return "%s:%s" % server.server_address[:2]
+    return "unix:%s" % server.server_address
+
+
+def handoff_argv(argv, fd, ready_fd):
+    args, skip = [], False
+    for arg in argv:
+        if skip:
+            skip = False
+        elif arg in HANDOFF_OPTIONS:
+            skip = True
+        elif not arg.startswith(tuple("%s=" % option for option in HANDOFF_OPTIONS)):
+            args.append(arg)
+    return args + ["--listen-fd", str(fd), "--ready-fd", str(ready_fd)]
+
+
+def sd_notify(state):
+    path = os.environ.get("NOTIFY_SOCKET")
+    if not path:
+        return False
+    if path.startswith("@"):
+        path = "\0" + path[1:]
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM) as sock:
+            sock.connect(path)
+            sock.sendall(state.encode("utf-8"))
+    except OSError:
+        return False
+    return True
+
+
+def notify_ready(fd):
+    try:
+        os.write(fd, READY)
+    except OSError:
+        return False
+    finally:
+        os.close(fd)
+    return True
+
+
+def reexec(server, argv, timeout=None):
+    fd = server.socket.fileno()
+    ready, notify = os.pipe()
+    if isinstance(server, UnixHTTPServer):
+        server.owner = None
+    pid = os.fork()
+    if pid == 0:
+        try:
+            os.close(ready)
+            os.set_inheritable(fd, True)
+            os.set_inheritable(notify, True)
+            os.execv(sys.executable, [sys.executable] + handoff_argv(argv, fd, notify))
+        finally:
+            os._exit(1)
+    os.close(notify)
+    try:
+        readable, _, _ = select.select([ready], [], [], timeout)
+        started = bool(readable) and os.read(ready, len(READY)) == READY
+    finally:
+        os.close(ready)
+    if started:
+        return pid
+    if not readable:
+        os.kill(pid, signal.SIGTERM)
+    os.waitpid(pid, 0)
+    if isinstance(server, UnixHTTPServer):
+        server.owner = os.getpid()
+    return None
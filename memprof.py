@@ -0,0 +1,167 @@
+import contextvars
+import json
+import threading
+import tracemalloc
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+
+CURRENT = contextvars.ContextVar("memprof_record", default=None)
+FILTERS = [
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, __file__),
+]
+
+
+def take_snapshot():
+    return tracemalloc.take_snapshot().filter_traces(FILTERS)
+
+
+def fold(record, *frames):
+    # Credit the peak since the last reset to every open stage before
+    # resetting it, so a nested stage does not hide its parent's peak.
+    current, peak = tracemalloc.get_traced_memory()
+    for frame in record["open"] + list(frames):
+        frame["peak"] = max(frame["peak"], peak - frame["start"])
+    tracemalloc.reset_peak()
+    return current
+
+
+class MethodMemory:
+    def __init__(self):
+        self.requests = 0
+        self.peak = 0
+        self.stage_bytes = defaultdict(int)
+        self.stage_peak = defaultdict(int)
+        self.sites = Counter()
+        self.site_counts = Counter()
+
+    def report(self, top):
+        return {
+            "requests": self.requests,
+            "peak": self.peak,
+            "stages": {
+                name: {
+                    "avg_bytes": self.stage_bytes[name] // self.requests,
+                    "peak": self.stage_peak[name],
+                }
+                for name in self.stage_bytes
+            },
+            "top_sites": [
+                {
+                    "site": site,
+                    "avg_bytes": size // self.requests,
+                    "avg_count": self.site_counts[site] // self.requests,
+                }
+                for site, size in self.sites.most_common(top)
+            ],
+        }
+
+
+class MemoryProfiler:
+    def __init__(self, frames=1, top=10):
+        self.frames = frames
+        self.top = top
+        self.enabled = False
+        self.methods = defaultdict(MethodMemory)
+        self.lock = threading.Lock()
+        self.serial = threading.Lock()
+
+    def enable(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+    def reset(self):
+        with self.lock:
+            self.methods = defaultdict(MethodMemory)
+
+    def set_method(self, method):
+        record = CURRENT.get()
+        if record is not None:
+            record["method"] = str(method)
+
+    @contextmanager
+    def request(self):
+        if not self.enabled:
+            yield
+            return
+        # tracemalloc counters are process-wide, so profiled requests run
+        # one at a time to keep their numbers apart.
+        with self.serial:
+            before = take_snapshot()
+            root = {"start": tracemalloc.get_traced_memory()[0], "peak": 0}
+            tracemalloc.reset_peak()
+            record = {
+                "method": "unknown",
+                "peak": 0,
+                "open": [root],
+                "stages": defaultdict(int),
+                "stage_peak": defaultdict(int),
+            }
+            token = CURRENT.set(record)
+            try:
+                yield
+            finally:
+                CURRENT.reset(token)
+                if tracemalloc.is_tracing():
+                    fold(record)
+                    record["peak"] = root["peak"]
+                    after = take_snapshot()
+                    self.add(record, after.compare_to(before, "lineno"))
+
+    @contextmanager
+    def stage(self, name):
+        record = CURRENT.get()
+        if record is None or not tracemalloc.is_tracing():
+            yield
+            return
+        frame = {"start": fold(record), "peak": 0}
+        record["open"].append(frame)
+        try:
+            yield
+        finally:
+            record["open"].remove(frame)
+            if tracemalloc.is_tracing():
+                current = fold(record, frame)
+                record["stages"][name] += current - frame["start"]
+                record["stage_peak"][name] = max(
+                    record["stage_peak"][name], frame["peak"]
+                )
+
+    def add(self, record, diff):
+        with self.lock:
+            memory = self.methods[record["method"]]
+            memory.requests += 1
+            memory.peak = max(memory.peak, record["peak"])
+            for name, size in record["stages"].items():
+                memory.stage_bytes[name] += size
+                memory.stage_peak[name] = max(
+                    memory.stage_peak[name], record["stage_peak"][name]
+                )
+            for stat in diff:
+                if stat.size_diff <= 0:
+                    continue
+                frame = stat.traceback[0]
+                site = "%s:%s" % (frame.filename, frame.lineno)
+                memory.sites[site] += stat.size_diff
+                memory.site_counts[site] += stat.count_diff
+
+    def report(self):
+        with self.lock:
+            methods = {
+                method: memory.report(self.top)
+                for method, memory in self.methods.items()
+            }
+        return {"enabled": self.enabled, "methods": methods}
+
+    def dump(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.report(), f, indent=2)
+
+
+profiler = MemoryProfiler()
@@ -0,0 +1,35 @@
+import base64
+import hashlib
+import json
+
+PAGE_SIZE = 100
+
+
+def list_digest(items):
+    return hashlib.sha256(json.dumps(items).encode("utf-8")).hexdigest()[:16]
+
+
+def encode_cursor(offset, items):
+    raw = "%s:%s" % (offset, list_digest(items))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor, items):
+    if not cursor:
+        return 0
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8")
+        offset, digest = raw.split(":")
+        offset = int(offset)
+    except ValueError as exc:
+        raise ValueError("Invalid cursor") from exc
+    if digest != list_digest(items) or not 0 <= offset < len(items):
+        raise ValueError("Invalid cursor")
+    return offset
+
+
+def paginate(items, cursor=None, page_size=PAGE_SIZE):
+    offset = decode_cursor(cursor, items)
+    end = offset + page_size
+    next_cursor = encode_cursor(end, items) if end < len(items) else None
+    return items[offset:end], next_cursor
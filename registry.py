@@ -0,0 +1,112 @@
+import contextvars
+import threading
+import time
+from concurrent.futures import FIRST_EXCEPTION, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from concurrent.futures import wait
+
+from descriptor import Field
+
+
+class MethodOverloaded(Exception):
+    pass
+
+
+class MethodTimeout(Exception):
+    pass
+
+
+class MethodSpec:  # pylint: disable=too-many-instance-attributes
+    def __init__(
+        self, name, schema, handler, workers=4, max_concurrency=None, timeout=None
+    ):
+        self.name = name
+        self.schema = schema
+        self.handler = handler
+        self.workers = workers
+        self.max_concurrency = max_concurrency or workers
+        self.timeout = timeout
+        self.slots = threading.BoundedSemaphore(self.max_concurrency)
+        self.executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="method-%s" % name
+        )
+
+    def parse(self, arguments):
+        request = self.schema()
+        for attr, value in vars(self.schema).items():
+            if isinstance(value, Field):
+                setattr(request, attr, arguments.get(attr))
+        return request
+
+    def submit(self, *args, timeout=None):
+        # pylint: disable-next=consider-using-with
+        if not self.slots.acquire(blocking=False):
+            raise MethodOverloaded(self.name)
+        try:
+            context = contextvars.copy_context()
+            future = self.executor.submit(context.run, self.handler, *args)
+        except RuntimeError:
+            self.slots.release()
+            raise
+        future.add_done_callback(lambda _: self.slots.release())
+        try:
+            return future.result(timeout=timeout or self.timeout)
+        except FutureTimeoutError as exc:
+            future.cancel()
+            raise MethodTimeout(self.name) from exc
+
+    def shutdown(self, wait=True):
+        self.executor.shutdown(wait=wait)
+
+
+class MethodRegistry:
+    def __init__(self):
+        self.methods = {}
+
+    def register(self, name, schema, handler, **settings):
+        spec = MethodSpec(name, schema, handler, **settings)
+        self.methods[name] = spec
+        return spec
+
+    def get(self, name):
+        return self.methods.get(name)
+
+    def __contains__(self, name):
+        return name in self.methods
+
+    def shutdown(self, wait=True):
+        for spec in self.methods.values():
+            spec.shutdown(wait=wait)
+
+
+def remaining(deadline):
+    if deadline is None:
+        return None
+    return max(deadline - time.monotonic(), 0)
+
+
+def fan_out(executor, func, items, width, timeout=None):
+    deadline = time.monotonic() + timeout if timeout else None
+    slots = threading.BoundedSemaphore(width)
+    futures = []
+    try:
+        for item in items:
+            # pylint: disable-next=consider-using-with
+            if not slots.acquire(timeout=remaining(deadline)):
+                raise MethodTimeout("fan-out")
+            context = contextvars.copy_context()
+            future = executor.submit(context.run, func, item)
+            future.add_done_callback(lambda _: slots.release())
+            futures.append(future)
+        done, not_done = wait(
+            futures, timeout=remaining(deadline), return_when=FIRST_EXCEPTION
+        )
+        for future in done:
+            if future.exception() is not None:
+                raise future.exception()
+        if not_done:
+            raise MethodTimeout("fan-out")
+        return [future.result() for future in futures]
+    finally:
+        for future in futures:
+            future.cancel()
@@ -0,0 +1,157 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import datetime
+import hashlib
+import http.client
+import json
+import threading
+import time
+from argparse import ArgumentParser
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from api import ADMIN_LOGIN, ADMIN_SALT, OK, SALT
+from capture import REDACTED, read_capture
+
+
+def sign(body):
+    if not isinstance(body, dict) or body.get("token") != REDACTED:
+        return body
+    if body.get("login") == ADMIN_LOGIN:
+        msg = datetime.datetime.now().strftime("%Y%m%d%H") + ADMIN_SALT
+    else:
+        msg = (body.get("account") or "") + (body.get("login") or "") + SALT
+    return dict(body, token=hashlib.sha512(msg.encode("utf-8")).hexdigest())
+
+
+def percentile(values, p):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(int(round(p / 100.0 * len(ordered))) - 1, 0)
+    return ordered[min(index, len(ordered) - 1)]
+
+
+class Stats:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.lags = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.lock = threading.Lock()
+
+    def add(self, method, latency, ok, lag=0.0):
+        with self.lock:
+            self.latencies[method].append(latency)
+            self.lags[method].append(lag)
+            if not ok:
+                self.errors[method] += 1
+
+    def report(self, elapsed):
+        rows = []
+        for method in sorted(self.latencies):
+            latencies = self.latencies[method]
+            rows.append(
+                {
+                    "method": method,
+                    "requests": len(latencies),
+                    "rps": len(latencies) / elapsed if elapsed else 0.0,
+                    "error_rate": self.errors[method] / len(latencies),
+                    "p50": percentile(latencies, 50),
+                    "p90": percentile(latencies, 90),
+                    "p99": percentile(latencies, 99),
+                    "max": max(latencies),
+                    "lag_p99": percentile(self.lags[method], 99),
+                }
+            )
+        return rows
+
+
+def send(url, record):
+    parts = urlsplit(url)
+    conn = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=30)
+    body = json.dumps(sign(record["body"]))
+    start = time.monotonic()
+    try:
+        conn.request("POST", record.get("path") or parts.path or "/method/", body=body)
+        response = conn.getresponse()
+        code = json.loads(response.read()).get("code", response.status)
+    except (OSError, ValueError):
+        code = None
+    finally:
+        conn.close()
+    return time.monotonic() - start, code
+
+
+def replay(records, url, speed=1.0, concurrency=16):
+    stats = Stats()
+    if not records:
+        return stats, 0.0
+    first = records[0]["ts"]
+
+    def run(record, scheduled):
+        started = time.monotonic()
+        if scheduled is None:
+            scheduled = started
+        latency, code = send(url, record)
+        lag = started - scheduled
+        stats.add(record.get("method") or "unknown", lag + latency, code == OK, lag)
+
+    start = time.monotonic()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for record in records:
+            scheduled = None
+            if speed > 0:
+                scheduled = start + (record["ts"] - first) / speed
+                delay = scheduled - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+            executor.submit(run, record, scheduled)
+    return stats, time.monotonic() - start
+
+
+HEADER = (
+    "method",
+    "requests",
+    "rps",
+    "errors",
+    "p50 ms",
+    "p90 ms",
+    "p99 ms",
+    "max ms",
+    "lag p99 ms",
+)
+
+
+def format_report(rows):
+    lines = ["%-20s %8s %8s %7s %8s %8s %8s %8s %10s" % HEADER]
+    for row in rows:
+        lines.append(
+            "%-20s %8d %8.1f %6.1f%% %8.2f %8.2f %8.2f %8.2f %10.2f"
+            % (
+                row["method"],
+                row["requests"],
+                row["rps"],
+                row["error_rate"] * 100,
+                row["p50"] * 1000,
+                row["p90"] * 1000,
+                row["p99"] * 1000,
+                row["max"] * 1000,
+                row["lag_p99"] * 1000,
+            )
+        )
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser()
+    parser.add_argument("captures", nargs="+")
+    parser.add_argument("-u", "--url", action="store", default="http://localhost:8080")
+    parser.add_argument("-s", "--speed", action="store", type=float, default=1.0)
+    parser.add_argument("-c", "--concurrency", action="store", type=int, default=16)
+    args = parser.parse_args()
+    stats, elapsed = replay(
+        read_capture(args.captures), args.url, args.speed, args.concurrency
+    )
+    print(format_report(stats.report(elapsed)))
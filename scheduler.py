@@ -0,0 +1,127 @@
+import threading
+import time
+from collections import deque
+
+ADMIN = "admin"
+INTERACTIVE = "interactive"
+BULK = "bulk"
+WEIGHTS = {ADMIN: 8, INTERACTIVE: 4, BULK: 1}
+METHOD_CLASSES = {
+    "online_score": INTERACTIVE,
+    "clients_interests": BULK,
+    "memory_profile": ADMIN,
+    "client_filter": ADMIN,
+    "scheduler": ADMIN,
+}
+
+
+class Waiter:
+    def __init__(self, priority, enqueued):
+        self.priority = priority
+        self.enqueued = enqueued
+        self.event = threading.Event()
+        self.granted = False
+
+
+class PriorityScheduler:  # pylint: disable=too-many-instance-attributes
+    def __init__(
+        self,
+        slots,
+        weights=None,
+        method_classes=None,
+        account_classes=None,
+        starvation_age=1.0,
+        timeout=10,
+        clock=time.monotonic,
+    ):
+        self.free = slots
+        self.slots = slots
+        self.weights = dict(weights or WEIGHTS)
+        self.method_classes = dict(method_classes or METHOD_CLASSES)
+        self.account_classes = dict(account_classes or {})
+        self.starvation_age = starvation_age
+        self.timeout = timeout
+        self.clock = clock
+        self.queues = {priority: deque() for priority in self.weights}
+        self.passes = dict.fromkeys(self.weights, 0.0)
+        self.vtime = 0.0
+        self.granted = dict.fromkeys(self.weights, 0)
+        self.rejected = dict.fromkeys(self.weights, 0)
+        self.starved = 0
+        self.max_wait = dict.fromkeys(self.weights, 0.0)
+        self.lock = threading.Lock()
+
+    def classify(self, method, account=None, admin=False):
+        if admin:
+            return ADMIN
+        if account in self.account_classes:
+            return self.account_classes[account]
+        return self.method_classes.get(method, INTERACTIVE)
+
+    def acquire(self, priority, timeout=None):
+        with self.lock:
+            if self.free > 0 and not any(self.queues.values()):
+                self.free -= 1
+                self.granted[priority] += 1
+                return True
+            waiter = Waiter(priority, self.clock())
+            if not self.queues[priority]:
+                self.passes[priority] = max(self.passes[priority], self.vtime)
+            self.queues[priority].append(waiter)
+            self._dispatch()
+        waiter.event.wait(self.timeout if timeout is None else timeout)
+        with self.lock:
+            if waiter.granted:
+                return True
+            self.queues[priority].remove(waiter)
+            self.rejected[priority] += 1
+            return False
+
+    def release(self):
+        with self.lock:
+            self.free += 1
+            self._dispatch()
+
+    def _next(self):
+        now = self.clock()
+        heads = [queue[0] for queue in self.queues.values() if queue]
+        oldest = min(heads, key=lambda waiter: waiter.enqueued)
+        if now - oldest.enqueued >= self.starvation_age:
+            self.starved += 1
+            return oldest.priority
+        return min(
+            (waiter.priority for waiter in heads),
+            key=lambda priority: self.passes[priority],
+        )
+
+    def _dispatch(self):
+        while self.free > 0 and any(self.queues.values()):
+            priority = self._next()
+            waiter = self.queues[priority].popleft()
+            self.vtime = self.passes[priority]
+            self.passes[priority] += 1.0 / self.weights[priority]
+            self.free -= 1
+            self.granted[priority] += 1
+            self.max_wait[priority] = max(
+                self.max_wait[priority], self.clock() - waiter.enqueued
+            )
+            waiter.granted = True
+            waiter.event.set()
+
+    def report(self):
+        with self.lock:
+            return {
+                "slots": self.slots,
+                "in_flight": self.slots - self.free,
+                "starved": self.starved,
+                "classes": {
+                    priority: {
+                        "weight": weight,
+                        "depth": len(self.queues[priority]),
+                        "granted": self.granted[priority],
+                        "rejected": self.rejected[priority],
+                        "max_wait": self.max_wait[priority],
+                    }
+                    for priority, weight in self.weights.items()
+                },
+            }
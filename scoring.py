@@ -1,3 +1,6 @@
+import hashlib
+import json
+import logging
 import random
 
 interests = [
@@ -13,11 +16,37 @@ interests = [
     "geek",
     "otus",
 ]
+SCORE_TTL = 60 * 60
+
+
+def score_key(
+    phone, email, birthday=None, gender=None, first_name=None, last_name=None
+):
+    key_parts = [
+        first_name or "",
+        last_name or "",
+        str(phone or ""),
+        email or "",
+        birthday or "",
+        str(gender if gender is not None else ""),
+    ]
+    return "uid:" + hashlib.md5("|".join(key_parts).encode("utf-8")).hexdigest()
 
 
 def get_score(
     store, phone, email, birthday=None, gender=None, first_name=None, last_name=None
 ):
+    cache = store if hasattr(store, "cache_get") else None
+    key = score_key(phone, email, birthday, gender, first_name, last_name)
+    if cache is not None:
+        try:
+            score = cache.cache_get(key)
+        except Exception as e:
+            logging.warning("Score cache read failed: %s" % e)
+            score = None
+        if score is not None:
+            return score
+
     score = 0
     if phone:
         score += 1.5
@@ -27,8 +56,22 @@ def get_score(
         score += 1.5
     if first_name and last_name:
         score += 0.5
+
+    if cache is not None:
+        try:
+            cache.cache_set(key, score, SCORE_TTL)
+        except Exception as e:
+            logging.warning("Score cache write failed: %s" % e)
     return score
 
 
+def get_interests_many(store, cids):
+    values = store.get_many(["i:%s" % cid for cid in cids])
+    return [json.loads(r) if r else [] for r in values]
+
+
 def get_interests(store, cid):
-    return random.sample(interests, 2)
+    if store is None:
+        return random.sample(interests, 2)
+    r = store.get("i:%s" % cid)
+    return json.loads(r) if r else []
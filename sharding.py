@@ -0,0 +1,121 @@
+import bisect
+import hashlib
+import threading
+from collections import defaultdict
+
+from registry import fan_out
+
+VIRTUAL_NODES = 100
+
+
+def batched(node):
+    return getattr(node, "batched", hasattr(node, "get_many"))
+
+
+def ring_hash(value):
+    digest = hashlib.md5(value.encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big")
+
+
+class ShardedStore:  # pylint: disable=too-many-instance-attributes
+    def __init__(
+        self, nodes, vnodes=VIRTUAL_NODES, executor=None, width=None, timeout=None
+    ):
+        self.vnodes = vnodes
+        self.executor = executor
+        self.width = width
+        self.timeout = timeout
+        self.nodes = {}
+        self.ring = []
+        self.owners = []
+        self.lock = threading.Lock()
+        for name, store in nodes.items():
+            self.nodes[name] = store
+        self._rebuild()
+
+    def _rebuild(self):
+        points = sorted(
+            (ring_hash("%s#%s" % (name, i)), name)
+            for name in self.nodes
+            for i in range(self.vnodes)
+        )
+        self.ring = [point for point, _ in points]
+        self.owners = [name for _, name in points]
+
+    def add_node(self, name, store):
+        with self.lock:
+            self.nodes[name] = store
+            self._rebuild()
+
+    def remove_node(self, name):
+        with self.lock:
+            del self.nodes[name]
+            self._rebuild()
+
+    def _owner(self, key):
+        if not self.ring:
+            raise LookupError("No store nodes")
+        index = bisect.bisect(self.ring, ring_hash(key)) % len(self.ring)
+        return self.owners[index]
+
+    def node_name(self, key):
+        with self.lock:
+            return self._owner(key)
+
+    def node(self, key):
+        with self.lock:
+            return self.nodes[self._owner(key)]
+
+    def group(self, items, key=lambda item: item):
+        groups, stores = defaultdict(list), {}
+        with self.lock:
+            for item in items:
+                name = self._owner(key(item))
+                stores[name] = self.nodes[name]
+                groups[name].append(item)
+        return [(stores[name], group) for name, group in groups.items()]
+
+    def get(self, key):
+        return self.node(key).get(key)
+
+    def _fetch(self, task):
+        node, node_keys = task
+        if batched(node):
+            return list(zip(node_keys, node.get_many(node_keys)))
+        return [(key, node.get(key)) for key in node_keys]
+
+    def get_many(self, keys):
+        tasks = []
+        for node, node_keys in self.group(keys):
+            if batched(node):
+                tasks.append((node, node_keys))
+            else:
+                tasks.extend((node, [key]) for key in node_keys)
+        if self.executor is not None and len(tasks) > 1:
+            found = fan_out(
+                self.executor,
+                self._fetch,
+                tasks,
+                self.width or len(tasks),
+                self.timeout,
+            )
+        else:
+            found = [self._fetch(task) for task in tasks]
+        values = {}
+        for pairs in found:
+            values.update(pairs)
+        return [values[key] for key in keys]
+
+    def cache_get(self, key):
+        return self.node(key).cache_get(key)
+
+    def cache_set(self, key, value, ttl=None):
+        return self.node(key).cache_set(key, value, ttl)
+
+    def cache_set_many(self, items):
+        for node, node_items in self.group(items, key=lambda item: item[0]):
+            if hasattr(node, "cache_set_many"):
+                node.cache_set_many(node_items)
+            else:
+                for key, value, ttl in node_items:
+                    node.cache_set(key, value, ttl)
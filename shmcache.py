@@ -0,0 +1,162 @@
+import hashlib
+import json
+import multiprocessing
+import os
+import struct
+import time
+from multiprocessing import shared_memory
+
+HEADER = struct.Struct("<QddHH")
+
+
+def key_hash(key):
+    return int.from_bytes(hashlib.blake2b(key, digest_size=8).digest(), "little")
+
+
+class SharedCache:
+    def __init__(self, slots=4096, slot_size=256, ways=8, stripes=64, name=None):
+        if slot_size <= HEADER.size:
+            raise ValueError("Slot size must be greater than %s" % HEADER.size)
+        self.ways = ways
+        self.sets = max(slots // ways, 1)
+        self.slot_size = slot_size
+        self.owner = os.getpid() if name is None else None
+        self.shm = shared_memory.SharedMemory(
+            name=name,
+            create=name is None,
+            size=self.sets * ways * slot_size,
+        )
+        self.locks = [multiprocessing.Lock() for _ in range(stripes)]
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def _locate(self, key):
+        key_bytes = key.encode("utf-8")
+        if not key_bytes:
+            raise ValueError("Key cannot be empty")
+        h = key_hash(key_bytes)
+        index = h % self.sets
+        return key_bytes, h, index, self.locks[index % len(self.locks)]
+
+    def _slots(self, index):
+        first = index * self.ways * self.slot_size
+        return range(first, first + self.ways * self.slot_size, self.slot_size)
+
+    def _match(self, buf, offset, h, key_bytes):
+        slot_hash, expires, _, key_len, value_len = HEADER.unpack_from(buf, offset)
+        if key_len != len(key_bytes) or slot_hash != h:
+            return None
+        start = offset + HEADER.size
+        if bytes(buf[start : start + key_len]) != key_bytes:
+            return None
+        return expires, value_len
+
+    def get(self, key):
+        key_bytes, h, index, lock = self._locate(key)
+        buf = self.shm.buf
+        now = time.time()
+        with lock:
+            for offset in self._slots(index):
+                found = self._match(buf, offset, h, key_bytes)
+                if found is None:
+                    continue
+                expires, value_len = found
+                if expires and expires < now:
+                    HEADER.pack_into(buf, offset, 0, 0, 0, 0, 0)
+                    break
+                HEADER.pack_into(
+                    buf, offset, h, expires, now, len(key_bytes), value_len
+                )
+                start = offset + HEADER.size + len(key_bytes)
+                return json.loads(bytes(buf[start : start + value_len]))
+        return None
+
+    def set(self, key, value, ttl=None):
+        expires = time.time() + ttl if ttl else 0
+        return self.set_raw(key, json.dumps(value).encode("utf-8"), expires)
+
+    def set_raw(self, key, data, expires=0):
+        key_bytes, h, index, lock = self._locate(key)
+        if HEADER.size + len(key_bytes) + len(data) > self.slot_size:
+            return False
+        buf = self.shm.buf
+        now = time.time()
+        with lock:
+            target, oldest = None, None
+            for offset in self._slots(index):
+                if self._match(buf, offset, h, key_bytes) is not None:
+                    target = offset
+                    break
+                _, slot_expires, accessed, key_len, _ = HEADER.unpack_from(buf, offset)
+                if not key_len or (slot_expires and slot_expires < now):
+                    accessed = -1
+                if oldest is None or accessed < oldest:
+                    target, oldest = offset, accessed
+            start = target + HEADER.size
+            buf[start : start + len(key_bytes)] = key_bytes
+            start += len(key_bytes)
+            buf[start : start + len(data)] = data
+            HEADER.pack_into(buf, target, h, expires, now, len(key_bytes), len(data))
+        return True
+
+    def items(self):
+        buf = self.shm.buf
+        now = time.time()
+        for index in range(self.sets):
+            entries = []
+            with self.locks[index % len(self.locks)]:
+                for offset in self._slots(index):
+                    _, expires, _, key_len, value_len = HEADER.unpack_from(buf, offset)
+                    if not key_len or (expires and expires < now):
+                        continue
+                    start = offset + HEADER.size
+                    key = bytes(buf[start : start + key_len]).decode("utf-8")
+                    start += key_len
+                    value = bytes(buf[start : start + value_len])
+                    entries.append((key, value, expires))
+            yield from entries
+
+    def close(self):
+        self.shm.close()
+        if self.owner == os.getpid():
+            self.shm.unlink()
+
+
+class SharedCacheStore:
+    def __init__(self, store, cache, ttl=60):
+        self.store = store
+        self.cache = cache
+        self.ttl = ttl
+
+    def get(self, key):
+        value = self.cache.get(key)
+        if value is None:
+            value = self.store.get(key)
+            if value is not None:
+                self.cache.set(key, value, self.ttl)
+        return value
+
+    def get_many(self, keys):
+        values = [self.cache.get(key) for key in keys]
+        missing = [key for key, value in zip(keys, values) if value is None]
+        if missing:
+            found = dict(zip(missing, self.store.get_many(missing)))
+            for key, value in found.items():
+                if value is not None:
+                    self.cache.set(key, value, self.ttl)
+            values = [found.get(key, value) for key, value in zip(keys, values)]
+        return values
+
+    def cache_get(self, key):
+        value = self.cache.get(key)
+        if value is None:
+            value = self.store.cache_get(key)
+            if value is not None:
+                self.cache.set(key, value, self.ttl)
+        return value
+
+    def cache_set(self, key, value, ttl=None):
+        self.cache.set(key, value, ttl)
+        self.store.cache_set(key, value, ttl)
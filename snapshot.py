@@ -0,0 +1,95 @@
+import logging
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+
+MAGIC = b"SCS1"
+RECORD = struct.Struct("<dHI")
+
+
+def save(cache, path):
+    directory, name = os.path.split(path)
+    fd, tmp_path = tempfile.mkstemp(prefix="%s." % name, dir=directory or None)
+    count = 0
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(MAGIC)
+            for key, data, expires in cache.items():
+                key_bytes = key.encode("utf-8")
+                f.write(RECORD.pack(expires, len(key_bytes), len(data)))
+                f.write(key_bytes)
+                f.write(data)
+                count += 1
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return count
+
+
+def load(cache, path):
+    try:
+        f = open(path, "rb")
+    except FileNotFoundError:
+        return 0
+    with f:
+        if os.fstat(f.fileno()).st_size < len(MAGIC):
+            return 0
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+            if buf[: len(MAGIC)] != MAGIC:
+                raise ValueError("Not a cache snapshot: %s" % path)
+            now = time.time()
+            offset, count = len(MAGIC), 0
+            while offset + RECORD.size <= len(buf):
+                expires, key_len, value_len = RECORD.unpack_from(buf, offset)
+                offset += RECORD.size
+                if offset + key_len + value_len > len(buf):
+                    logging.warning("Truncated cache snapshot: %s" % path)
+                    break
+                key = buf[offset : offset + key_len].decode("utf-8")
+                offset += key_len
+                data = buf[offset : offset + value_len]
+                offset += value_len
+                if expires and expires < now:
+                    continue
+                if cache.set_raw(key, data, expires):
+                    count += 1
+            return count
+
+
+class Snapshotter:
+    def __init__(self, cache, path, interval=60):
+        self.cache = cache
+        self.path = path
+        self.interval = interval
+        self.stopped = threading.Event()
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(
+            target=self._run, name="cache-snapshot", daemon=True
+        )
+        self.thread.start()
+        return self
+
+    def _run(self):
+        while not self.stopped.wait(self.interval):
+            self.snapshot()
+
+    def snapshot(self):
+        try:
+            count = save(self.cache, self.path)
+        except Exception as e:
+            logging.exception("Cache snapshot failed: %s" % e)
+            return None
+        logging.info("Saved %s cache entries to %s" % (count, self.path))
+        return count
+
+    def stop(self):
+        self.stopped.set()
+        if self.thread is not None:
+            self.thread.join()
+        return self.snapshot()
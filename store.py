@@ -0,0 +1,44 @@
+import threading
+import time
+
+
+class Store:
+    def __init__(self):
+        self.data = {}
+        self.cache = {}
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            return self.data.get(key)
+
+    def keys(self, prefix=""):
+        with self.lock:
+            return [key for key in self.data if key.startswith(prefix)]
+
+    def get_many(self, keys):
+        with self.lock:
+            return [self.data.get(key) for key in keys]
+
+    def set(self, key, value):
+        with self.lock:
+            self.data[key] = value
+
+    def cache_get(self, key):
+        with self.lock:
+            value, expires = self.cache.get(key, (None, None))
+            if expires is not None and expires < time.monotonic():
+                del self.cache[key]
+                return None
+            return value
+
+    def cache_set(self, key, value, ttl=None):
+        expires = time.monotonic() + ttl if ttl else None
+        with self.lock:
+            self.cache[key] = (value, expires)
+
+    def cache_set_many(self, items):
+        now = time.monotonic()
+        with self.lock:
+            for key, value, ttl in items:
+                self.cache[key] = (value, now + ttl if ttl else None)
@@ -0,0 +1,25 @@
+import threading
+from http.server import HTTPServer
+
+import pytest
+
+import api
+from tracing import tracer
+
+
+@pytest.fixture
+def server():
+    httpd = HTTPServer(("localhost", 0), api.MainHTTPHandler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@pytest.fixture
+def trace_path(tmp_path):
+    path = tmp_path / "trace.json"
+    tracer.configure(str(path))
+    yield path
+    tracer.configure(None)
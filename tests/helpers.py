@@ -0,0 +1,29 @@
+import datetime
+import hashlib
+import http.client
+
+import api
+
+
+def make_request(method, arguments, login="h&f"):
+    request = {
+        "account": "horns&hoofs",
+        "login": login,
+        "method": method,
+        "arguments": arguments,
+    }
+    if login == api.ADMIN_LOGIN:
+        msg = datetime.datetime.now().strftime("%Y%m%d%H") + api.ADMIN_SALT
+    else:
+        msg = request["account"] + request["login"] + api.SALT
+    request["token"] = hashlib.sha512(msg.encode("utf-8")).hexdigest()
+    return request
+
+
+def post(server, body, headers=None, path="/method/"):
+    conn = http.client.HTTPConnection("localhost", server.server_address[1])
+    conn.request("POST", path, body=body, headers=headers or {})
+    response = conn.getresponse()
+    data = response.read()
+    conn.close()
+    return response, data
@@ -1,9 +1,16 @@
 import datetime
 import hashlib
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
 
 import pytest
 
 import api
+from breaker import BreakerStore
+from pagination import encode_cursor
+from sharding import ShardedStore
+from store import Store
 
 
 @pytest.fixture
@@ -277,3 +284,102 @@ def test_ok_interests_request(arguments, context, headers, settings):
         for v in response.values()
     )
     assert context.get("nclients") == len(arguments["client_ids"])
+
+
+def test_interests_request_ignores_store_by_default(context, headers):
+    request = {
+        "account": "horns&hoofs",
+        "login": "h&f",
+        "method": "clients_interests",
+        "arguments": {"client_ids": [1, 2]},
+    }
+    set_valid_auth(request)
+    response, code = get_response(request, context, headers, Store())
+    assert code == api.OK
+    assert all(len(v) == 2 for v in response.values())
+
+
+class SlowGetStore:
+    def __init__(self, delay):
+        self.delay = delay
+
+    def get(self, key):
+        time.sleep(self.delay)
+        return json.dumps(["cars", key])
+
+
+def test_interests_request_fans_out_get_only_store(context, headers, monkeypatch):
+    monkeypatch.setattr(api, "INTERESTS_FROM_STORE", True)
+    request = {
+        "account": "horns&hoofs",
+        "login": "h&f",
+        "method": "clients_interests",
+        "arguments": {"client_ids": list(range(10))},
+    }
+    set_valid_auth(request)
+    with ThreadPoolExecutor(max_workers=10) as executor:
+        store = ShardedStore(
+            {"node0": BreakerStore(SlowGetStore(0.2))},
+            executor=executor,
+            width=10,
+            timeout=5,
+        )
+        start = time.monotonic()
+        response, code = get_response(request, context, headers, store)
+        elapsed = time.monotonic() - start
+    assert code == api.OK
+    assert response == {cid: ["cars", "i:%s" % cid] for cid in range(10)}
+    assert elapsed < 1
+
+
+def test_interests_request_deduplicates_client_ids(context, headers, settings):
+    request = {
+        "account": "horns&hoofs",
+        "login": "h&f",
+        "method": "clients_interests",
+        "arguments": {"client_ids": [3, 1, 3, 2, 1]},
+    }
+    set_valid_auth(request)
+    response, code = get_response(request, context, headers, settings)
+    assert code == api.OK
+    assert list(response) == [3, 1, 2]
+    assert context.get("nclients") == 5
+
+
+def test_interests_request_pagination(context, headers, settings, monkeypatch):
+    monkeypatch.setattr(api, "INTERESTS_PAGE_SIZE", 2)
+    arguments = {"client_ids": [1, 2, 3, 2, 4, 5]}
+    pages = []
+    while True:
+        request = {
+            "account": "horns&hoofs",
+            "login": "h&f",
+            "method": "clients_interests",
+            "arguments": arguments,
+        }
+        set_valid_auth(request)
+        context = {}
+        response, code = get_response(request, context, headers, settings)
+        assert code == api.OK
+        pages.append(list(response))
+        if "next_cursor" not in context:
+            break
+        arguments = dict(arguments, cursor=context["next_cursor"])
+    assert pages == [[1, 2], [3, 4], [5]]
+
+
+@pytest.mark.parametrize(
+    "cursor",
+    ["garbage", encode_cursor(2, [9, 8, 7]), encode_cursor(10, [1, 2, 3])],
+)
+def test_interests_request_invalid_cursor(cursor, context, headers, settings):
+    request = {
+        "account": "horns&hoofs",
+        "login": "h&f",
+        "method": "clients_interests",
+        "arguments": {"client_ids": [1, 2, 3], "cursor": cursor},
+    }
+    set_valid_auth(request)
+    response, code = get_response(request, context, headers, settings)
+    assert code == api.INVALID_REQUEST
+    assert response == "Invalid cursor"
@@ -0,0 +1,96 @@
+import json
+
+import pytest
+
+import api
+from bloom import BloomFilter, ClientFilter
+from store import Store
+from tests.helpers import make_request
+
+
+class CountingStore(Store):
+    def __init__(self):
+        super().__init__()
+        self.requested = []
+
+    def get_many(self, keys):
+        self.requested.extend(keys)
+        return super().get_many(keys)
+
+
+def test_bloom_has_no_false_negatives():
+    bloom = BloomFilter(1000, 0.01)
+    for i in range(1000):
+        bloom.add(i)
+    assert all(i in bloom for i in range(1000))
+
+
+@pytest.mark.parametrize("fp_rate", [0.1, 0.01])
+def test_bloom_false_positive_rate(fp_rate):
+    bloom = BloomFilter(2000, fp_rate)
+    for i in range(2000):
+        bloom.add(i)
+    false_positives = sum(i in bloom for i in range(10000, 30000))
+    assert false_positives / 20000 < fp_rate * 2
+
+
+def test_client_filter_counts_and_refresh():
+    known = [1, 2]
+    client_filter = ClientFilter(lambda: known)
+    assert client_filter.might_contain([1, 5]) == [True, True]
+    client_filter.refresh()
+    assert client_filter.might_contain([1, 2, 5]) == [True, True, False]
+    known.append(5)
+    client_filter.refresh()
+    assert client_filter.might_contain([5]) == [True]
+    assert client_filter.report() == {
+        "clients": 3,
+        "fp_rate": 0.01,
+        "checks": 4,
+        "hits": 3,
+        "skipped": 1,
+    }
+
+
+@pytest.fixture
+def store(monkeypatch):
+    store = CountingStore()
+    store.set("i:1", json.dumps(["cars"]))
+    store.set("i:2", json.dumps(["pets"]))
+    client_filter = ClientFilter(
+        lambda: [int(key[2:]) for key in store.keys("i:")]
+    ).refresh()
+    monkeypatch.setattr(api, "CLIENT_FILTER", client_filter)
+    monkeypatch.setattr(api, "INTERESTS_FROM_STORE", True)
+    return store
+
+
+def call(request, store):
+    return api.method_handler({"body": request, "headers": {}}, {}, store)
+
+
+def test_unknown_clients_skip_the_store(store):
+    request = make_request("clients_interests", {"client_ids": [7, 1, 2, 9]})
+    response, code = call(request, store)
+    assert code == api.OK
+    assert list(response) == [7, 1, 2, 9]
+    assert response == {7: [], 1: ["cars"], 2: ["pets"], 9: []}
+    assert all(key in ("i:1", "i:2") for key in store.requested)
+
+
+def test_client_filter_method(store):
+    request = make_request("client_filter", {"action": "report"}, api.ADMIN_LOGIN)
+    response, code = call(request, store)
+    assert code == api.OK
+    assert response["clients"] == 2
+
+    store.set("i:3", json.dumps(["tv"]))
+    request = make_request("client_filter", {"action": "refresh"}, api.ADMIN_LOGIN)
+    response, code = call(request, store)
+    assert code == api.OK
+    assert response["clients"] == 3
+
+
+def test_client_filter_method_is_admin_only(store):
+    _, code = call(make_request("client_filter", {"action": "report"}), store)
+    assert code == api.FORBIDDEN
@@ -0,0 +1,138 @@
+import hashlib
+
+import pytest
+
+import api
+from breaker import (
+    CLOSED,
+    HALF_OPEN,
+    OPEN,
+    BreakerStore,
+    CircuitBreaker,
+    CircuitOpen,
+)
+from scoring import get_interests, get_score
+from store import Store
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class BrokenStore(Store):
+    def __init__(self):
+        super().__init__()
+        self.broken = False
+
+    def get(self, key):
+        if self.broken:
+            raise ConnectionError("store is down")
+        return super().get(key)
+
+    def cache_get(self, key):
+        if self.broken:
+            raise ConnectionError("store is down")
+        return super().cache_get(key)
+
+
+def fail():
+    raise ConnectionError("store is down")
+
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+
+@pytest.fixture
+def breaker(clock):
+    return CircuitBreaker(min_calls=2, window=4, reset_timeout=5, clock=clock)
+
+
+def test_opens_on_error_rate(breaker):
+    for _ in range(2):
+        with pytest.raises(ConnectionError):
+            breaker.call(fail)
+    assert breaker.state == OPEN
+    with pytest.raises(CircuitOpen):
+        breaker.call(lambda: 1)
+
+
+def test_opens_on_latency(breaker, clock):
+    def slow():
+        clock.now += 1
+        return 1
+
+    assert breaker.call(slow) == 1
+    assert breaker.call(slow) == 1
+    assert breaker.state == OPEN
+
+
+def test_half_open_probe(breaker, clock):
+    for _ in range(2):
+        with pytest.raises(ConnectionError):
+            breaker.call(fail)
+    clock.now += 5
+    assert breaker.allow()
+    assert breaker.state == HALF_OPEN
+    assert not breaker.allow()
+    breaker.record(True)
+    assert breaker.state == CLOSED
+
+
+def test_failed_probe_reopens(breaker, clock):
+    for _ in range(2):
+        with pytest.raises(ConnectionError):
+            breaker.call(fail)
+    clock.now += 5
+    with pytest.raises(ConnectionError):
+        breaker.call(fail)
+    assert breaker.state == OPEN
+    assert not breaker.allow()
+
+
+def test_breaker_store_returns_stale_value(breaker):
+    store = BrokenStore()
+    store.set("i:1", '["cars"]')
+    wrapped = BreakerStore(store, breaker)
+    assert get_interests(wrapped, 1) == ["cars"]
+    store.broken = True
+    for _ in range(2):
+        assert get_interests(wrapped, 1) == ["cars"]
+    assert breaker.state == OPEN
+    with pytest.raises(CircuitOpen):
+        get_interests(wrapped, 2)
+
+
+def test_get_score_computes_locally_when_open(breaker):
+    store = BrokenStore()
+    store.broken = True
+    wrapped = BreakerStore(store, breaker)
+    for _ in range(3):
+        assert get_score(wrapped, "79123456789", "user@gmail.com") == 3
+    assert breaker.state == OPEN
+
+
+def test_method_handler_fails_fast_when_open(breaker, monkeypatch):
+    monkeypatch.setattr(api, "INTERESTS_FROM_STORE", True)
+    for _ in range(2):
+        with pytest.raises(ConnectionError):
+            breaker.call(fail)
+    request = {
+        "account": "horns&hoofs",
+        "login": "h&f",
+        "method": "clients_interests",
+        "arguments": {"client_ids": [1]},
+    }
+    request["token"] = hashlib.sha512(
+        (request["account"] + request["login"] + api.SALT).encode("utf-8")
+    ).hexdigest()
+    response, code = api.method_handler(
+        {"body": request, "headers": {}}, {}, BreakerStore(Store(), breaker)
+    )
+    assert code == api.SERVICE_UNAVAILABLE
+    assert response == "Service Unavailable"
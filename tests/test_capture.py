@@ -0,0 +1,109 @@
+import json
+import time
+
+import api
+import replay
+from capture import REDACTED, Capture, read_capture, redact
+from tests.helpers import make_request, post
+
+
+def test_redact():
+    assert redact({"login": "h&f", "token": "secret"}) == {
+        "login": "h&f",
+        "token": REDACTED,
+    }
+    assert redact({"login": "h&f"}) == {"login": "h&f"}
+
+
+def test_capture_rotates(tmp_path):
+    path = tmp_path / "capture.jsonl"
+    capture = Capture(str(path), max_bytes=300, backups=2)
+    for i in range(10):
+        capture.record(i, 0.01, "/method/", {"method": "online_score"}, 200)
+    capture.close()
+    assert (tmp_path / "capture.jsonl.1").exists()
+    assert not (tmp_path / "capture.jsonl.3").exists()
+    paths = sorted(str(p) for p in tmp_path.iterdir())
+    records = read_capture(paths)
+    assert [r["ts"] for r in records] == sorted(r["ts"] for r in records)
+
+
+def test_capture_sampling(tmp_path):
+    path = tmp_path / "capture.jsonl"
+    capture = Capture(str(path), sample_rate=0)
+    capture.record(0, 0.01, "/method/", {"method": "online_score"}, 200)
+    capture.close()
+    assert path.read_text() == ""
+
+
+def test_sign_restores_valid_token():
+    body = redact(make_request("online_score", {"first_name": "a"}))
+    assert replay.sign(body)["token"] == make_request("online_score", {})["token"]
+    admin = redact(make_request("online_score", {}, login=api.ADMIN_LOGIN))
+    assert (
+        replay.sign(admin)["token"]
+        == make_request("online_score", {}, login=api.ADMIN_LOGIN)["token"]
+    )
+
+
+def test_percentile():
+    values = [i / 100 for i in range(1, 101)]
+    assert replay.percentile(values, 50) == 0.5
+    assert replay.percentile(values, 99) == 0.99
+    assert replay.percentile([], 99) == 0.0
+
+
+def test_capture_and_replay(server, tmp_path, monkeypatch):
+    path = tmp_path / "capture.jsonl"
+    monkeypatch.setattr(api.MainHTTPHandler, "capture", Capture(str(path)))
+    score = make_request("online_score", {"first_name": "a", "last_name": "b"})
+    interests = make_request("clients_interests", {"client_ids": [1, 2]})
+    bad = make_request("online_score", {"first_name": "a"})
+    for body in (score, interests, bad):
+        post(server, json.dumps(body), {"X-Request-Id": "req"})
+    server.shutdown()
+    api.MainHTTPHandler.capture.close()
+
+    records = read_capture([str(path)])
+    assert [r["method"] for r in records] == [
+        "online_score",
+        "clients_interests",
+        "online_score",
+    ]
+    assert all(r["body"]["token"] == REDACTED for r in records)
+    assert [r["code"] for r in records] == [api.OK, api.OK, api.INVALID_REQUEST]
+    assert all(r["duration"] >= 0 and r["request_id"] == "req" for r in records)
+
+
+def test_replay_reports_per_method(server):
+    bodies = [
+        make_request("online_score", {"first_name": "a", "last_name": "b"}),
+        make_request("clients_interests", {"client_ids": [1, 2]}),
+        make_request("online_score", {"first_name": "a"}),
+    ]
+    records = [
+        {"ts": i * 0.01, "path": "/method/", "method": b["method"], "body": redact(b)}
+        for i, b in enumerate(bodies)
+    ]
+    stats, elapsed = replay.replay(
+        records, "http://localhost:%s" % server.server_address[1], speed=2
+    )
+    rows = {row["method"]: row for row in stats.report(elapsed)}
+    assert rows["online_score"]["requests"] == 2
+    assert rows["online_score"]["error_rate"] == 0.5
+    assert rows["clients_interests"]["error_rate"] == 0
+    assert "online_score" in replay.format_report(stats.report(elapsed))
+
+
+def test_replay_latency_includes_queueing(monkeypatch):
+    def send(url, record):
+        time.sleep(0.05)
+        return 0.05, api.OK
+
+    monkeypatch.setattr(replay, "send", send)
+    records = [{"ts": 0, "method": "online_score", "body": {}} for _ in range(4)]
+    stats, elapsed = replay.replay(records, "http://localhost", concurrency=1)
+    row = stats.report(elapsed)[0]
+    assert row["max"] >= 0.19
+    assert row["lag_p99"] >= 0.14
+    assert row["p50"] >= 0.09
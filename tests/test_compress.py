@@ -0,0 +1,91 @@
+import gzip
+
+import pytest
+
+import compress
+
+
+@pytest.mark.parametrize(
+    "header, encoding",
+    [
+        (None, compress.IDENTITY),
+        ("", compress.IDENTITY),
+        ("gzip", compress.GZIP),
+        ("deflate, gzip;q=0.5", compress.GZIP),
+        ("gzip;q=0", compress.IDENTITY),
+        ("*", compress.supported_encodings()[0]),
+        ("br", compress.IDENTITY),
+    ],
+)
+def test_choose_encoding(header, encoding):
+    assert compress.choose_encoding(header) == encoding
+
+
+def test_encode_body_skips_small_payloads():
+    data = b'{"code": 200}'
+    assert compress.encode_body(data, "gzip", min_size=1024) == (
+        data,
+        compress.IDENTITY,
+    )
+
+
+def test_encode_body_gzip_roundtrip():
+    data = b'["cars", "pets"]' * 200
+    body, encoding = compress.encode_body(data, "gzip", level=1, min_size=10)
+    assert encoding == compress.GZIP
+    assert len(body) < len(data)
+    assert gzip.decompress(body) == data
+    assert compress.decompress(body, "gzip") == data
+
+
+@pytest.mark.parametrize("encoding", [None, "", "identity"])
+def test_decompress_identity(encoding):
+    assert compress.decompress(b"data", encoding) == b"data"
+
+
+def test_decompress_unsupported():
+    with pytest.raises(ValueError, match="^Unsupported encoding: br$"):
+        compress.decompress(b"data", "br")
+
+
+def test_decompress_rejects_gzip_bomb():
+    body = gzip.compress(b"\0" * (compress.MAX_BODY_SIZE + 1))
+    assert len(body) < 64 * 1024
+    with pytest.raises(ValueError, match="^Body exceeds"):
+        compress.decompress(body, "gzip")
+    size = compress.MAX_BODY_SIZE + 1
+    assert len(compress.decompress(body, "gzip", max_size=size)) == size
+
+
+def test_decompress_rejects_truncated_gzip():
+    body = gzip.compress(b'["cars", "pets"]' * 200)
+    with pytest.raises(ValueError, match="^Truncated gzip body$"):
+        compress.decompress(body[:-10], "gzip")
+
+
+def test_decompress_gzip_members():
+    body = gzip.compress(b'["cars", ') + gzip.compress(b'"pets"]')
+    assert compress.decompress(body, "gzip") == b'["cars", "pets"]'
+    with pytest.raises(ValueError, match="^Body exceeds"):
+        compress.decompress(body, "gzip", max_size=10)
+    with pytest.raises(ValueError, match="^Truncated gzip body$"):
+        compress.decompress(body[:-10], "gzip")
+
+
+def test_zstd_roundtrip():
+    pytest.importorskip("zstandard")
+    data = b'["cars", "pets"]' * 200
+    body, encoding = compress.encode_body(data, "zstd", level=1, min_size=10)
+    assert encoding == compress.ZSTD
+    assert len(body) < len(data)
+    assert compress.decompress(body, "zstd") == data
+    assert compress.decompress(body + body, "zstd") == data + data
+    with pytest.raises(ValueError, match="^Truncated zstd body$"):
+        compress.decompress(body[:-10], "zstd")
+
+
+def test_decompress_rejects_zstd_bomb():
+    zstandard = pytest.importorskip("zstandard")
+    body = zstandard.ZstdCompressor().compress(b"\0" * (compress.MAX_BODY_SIZE + 1))
+    with pytest.raises(ValueError, match="^Body exceeds"):
+        compress.decompress(body, "zstd")
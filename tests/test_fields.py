@@ -2,7 +2,7 @@ from contextlib import nullcontext as does_not_raise
 
 import pytest
 
-from descriptor import Field
+from descriptor import MAX_CLIENT_IDS, Field
 
 
 @pytest.mark.parametrize(
@@ -68,3 +68,25 @@ def test_validate_email_field(val, res, expectation):
 
     with expectation:
         assert field.validate_email_field(val) == res
+
+
+@pytest.mark.parametrize(
+    "val, expectation",
+    [
+        ([1, 2], does_not_raise()),
+        (list(range(MAX_CLIENT_IDS)), does_not_raise()),
+        ([], pytest.raises(ValueError, match="^List cannot be empty$")),
+        (
+            list(range(MAX_CLIENT_IDS + 1)),
+            pytest.raises(
+                ValueError, match="^List cannot be longer than %s$" % MAX_CLIENT_IDS
+            ),
+        ),
+        ("1", pytest.raises(TypeError, match="^Field must be a list$")),
+    ],
+)
+def test_validate_client_ids_field(val, expectation):
+    field = Field()
+
+    with expectation:
+        assert field.validate_client_ids_field(val) == val
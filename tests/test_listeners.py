@@ -0,0 +1,179 @@
+import http.client
+import json
+import os
+import socket
+import threading
+import time
+
+import pytest
+
+import api
+import listeners
+from tests.helpers import make_request
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, path):
+        super().__init__("localhost")
+        self.path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.connect(self.path)
+
+
+def serve(server):
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return thread
+
+
+def score(conn):
+    body = json.dumps(
+        make_request("online_score", {"first_name": "a", "last_name": "b"})
+    )
+    conn.request("POST", "/method/", body=body)
+    response = conn.getresponse()
+    data = json.loads(response.read())
+    conn.close()
+    return response.status, data
+
+
+def test_unix_socket(tmp_path):
+    path = str(tmp_path / "api.sock")
+    server = listeners.make_server(api.MainHTTPHandler, unix_socket=path)
+    serve(server)
+    try:
+        assert listeners.describe(server) == "unix:%s" % path
+        assert score(UnixHTTPConnection(path)) == (
+            api.OK,
+            {"response": {"score": 0.5}, "code": api.OK},
+        )
+    finally:
+        server.shutdown()
+        server.server_close()
+    assert not os.path.exists(path)
+
+
+def test_unix_socket_replaces_stale_socket(tmp_path):
+    path = str(tmp_path / "api.sock")
+    stale = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    stale.bind(path)
+    stale.close()
+    server = listeners.make_server(api.MainHTTPHandler, unix_socket=path)
+    server.server_close()
+
+
+def test_unix_socket_refuses_regular_file(tmp_path):
+    path = tmp_path / "api.sock"
+    path.write_text("data")
+    with pytest.raises(ValueError, match="^Not a socket"):
+        listeners.make_server(api.MainHTTPHandler, unix_socket=str(path))
+
+
+def test_inherited_tcp_socket():
+    sock = socket.create_server(("localhost", 0))
+    port = sock.getsockname()[1]
+    server = listeners.make_server(api.MainHTTPHandler, listen_fd=sock.detach())
+    serve(server)
+    try:
+        assert listeners.describe(server) == "127.0.0.1:%s" % port
+        status, _ = score(http.client.HTTPConnection("localhost", port))
+        assert status == api.OK
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_systemd_listen_fd(monkeypatch):
+    monkeypatch.setenv("LISTEN_PID", str(os.getpid()))
+    monkeypatch.setenv("LISTEN_FDS", "1")
+    assert listeners.systemd_listen_fd() == 3
+    monkeypatch.setenv("LISTEN_PID", "1")
+    assert listeners.systemd_listen_fd() is None
+
+
+class SlowHandler(api.MainHTTPHandler):
+    release = None
+
+    def do_POST(self):
+        self.release.wait(5)
+        return super().do_POST()
+
+
+def test_drain_waits_for_in_flight_requests():
+    SlowHandler.release = threading.Event()
+    server = listeners.make_server(SlowHandler, port=0)
+    serve(server)
+    port = server.server_address[1]
+    results = []
+
+    def request():
+        results.append(score(http.client.HTTPConnection("localhost", port)))
+
+    client = threading.Thread(target=request)
+    client.start()
+    while not server.active:
+        time.sleep(0.001)
+    server.shutdown()
+    server.server_close()
+    try:
+        with pytest.raises(ConnectionRefusedError):
+            socket.create_connection(("localhost", port), timeout=1)
+        assert not server.drain(0.05)
+        SlowHandler.release.set()
+        assert server.drain(5)
+        client.join(5)
+        assert results[0][0] == api.OK
+        assert server.active == 0
+    finally:
+        server.server_close()
+
+
+def test_handoff_argv():
+    argv = ["api.py", "--listen-fd", "3", "-p", "8080", "--listen-fd=4", "--ready-fd=5"]
+    expected = ["api.py", "-p", "8080", "--listen-fd", "7", "--ready-fd", "8"]
+    assert listeners.handoff_argv(argv, 7, 8) == expected
+
+
+NEW_SERVER = """
+import os, sys, time
+if sys.argv[1] == "ready":
+    os.write(int(sys.argv[sys.argv.index("--ready-fd") + 1]), b"1")
+elif sys.argv[1] == "hang":
+    time.sleep(30)
+sys.exit(sys.argv[1] != "ready")
+"""
+
+
+@pytest.mark.parametrize(
+    "mode, started", [("ready", True), ("crash", False), ("hang", False)]
+)
+def test_reexec_waits_for_the_new_server(tmp_path, mode, started):
+    script = tmp_path / "new_server.py"
+    script.write_text(NEW_SERVER)
+    path = str(tmp_path / "api.sock")
+    server = listeners.make_server(api.MainHTTPHandler, unix_socket=path)
+    try:
+        pid = listeners.reexec(server, [str(script), mode], timeout=0.5)
+        assert (pid is not None) == started
+        assert server.owner == (None if started else os.getpid())
+        if started:
+            os.waitpid(pid, 0)
+    finally:
+        server.server_close()
+    assert os.path.exists(path) == started
+
+
+def test_sd_notify(tmp_path, monkeypatch):
+    monkeypatch.delenv("NOTIFY_SOCKET", raising=False)
+    assert not listeners.sd_notify("READY=1")
+
+    path = str(tmp_path / "notify.sock")
+    with socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM) as sock:
+        sock.bind(path)
+        monkeypatch.setenv("NOTIFY_SOCKET", path)
+        assert listeners.sd_notify("MAINPID=42")
+        assert sock.recv(64) == b"MAINPID=42"
+    monkeypatch.setenv("NOTIFY_SOCKET", str(tmp_path / "missing.sock"))
+    assert not listeners.sd_notify("READY=1")
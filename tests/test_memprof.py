@@ -0,0 +1,120 @@
+import json
+import threading
+
+import pytest
+
+import api
+from memprof import MemoryProfiler, profiler
+from tests.helpers import make_request, post
+from tracing import span, tracer
+
+
+@pytest.fixture
+def enabled_profiler():
+    profiler.reset()
+    profiler.enable()
+    yield profiler
+    profiler.disable()
+    profiler.reset()
+
+
+def call(request):
+    return api.method_handler({"body": request, "headers": {}}, {}, None)
+
+
+def test_disabled_profiler_adds_no_stage_wrapper():
+    assert not profiler.enabled
+    assert type(span("stage")) is type(tracer.span("stage"))
+
+
+def test_request_and_stage_accounting(enabled_profiler):
+    with enabled_profiler.request():
+        enabled_profiler.set_method("online_score")
+        with span("scoring"):
+            data = [str(i) * 10 for i in range(1000)]
+    report = enabled_profiler.report()["methods"]["online_score"]
+    assert report["requests"] == 1
+    assert report["stages"]["scoring"]["avg_bytes"] > 0
+    assert report["peak"] >= report["stages"]["scoring"]["peak"] > 0
+    assert any("test_memprof.py" in site["site"] for site in report["top_sites"])
+    assert len(data) == 1000
+
+
+def test_request_without_profiling_records_nothing():
+    local = MemoryProfiler()
+    with local.request():
+        local.set_method("online_score")
+    assert local.report() == {"enabled": False, "methods": {}}
+
+
+def test_memory_profile_method_is_admin_only():
+    response, code = call(make_request("memory_profile", {"action": "report"}))
+    assert code == api.FORBIDDEN
+    assert response == "Forbidden"
+
+
+def test_memory_profile_method(server):
+    admin = api.ADMIN_LOGIN
+
+    def control(action):
+        body = json.dumps(make_request("memory_profile", {"action": action}, admin))
+        response, data = post(server, body)
+        assert response.status == api.OK
+        return json.loads(data)["response"]
+
+    try:
+        assert control("start")["enabled"]
+        score = make_request("online_score", {"first_name": "a", "last_name": "b"})
+        post(server, json.dumps(score))
+        report = control("report")
+        methods = report["methods"]
+        assert methods["online_score"]["requests"] == 1
+        assert "check_auth" in methods["online_score"]["stages"]
+        assert control("reset")["methods"] == {}
+        assert not control("stop")["enabled"]
+    finally:
+        profiler.disable()
+        profiler.reset()
+
+
+def test_memory_profile_unknown_action():
+    request = make_request("memory_profile", {"action": "explode"}, api.ADMIN_LOGIN)
+    response, code = call(request)
+    assert code == api.INVALID_REQUEST
+    assert response == "Unknown action: explode"
+
+
+def test_dump(tmp_path):
+    path = tmp_path / "memprof.json"
+    MemoryProfiler().dump(str(path))
+    assert json.loads(path.read_text()) == {"enabled": False, "methods": {}}
+
+
+def test_nested_stage_keeps_outer_peak(enabled_profiler):
+    with enabled_profiler.request():
+        enabled_profiler.set_method("online_score")
+        with span("outer"):
+            data = bytearray(10 * 1024 * 1024)
+            del data
+            with span("inner"):
+                small = [0] * 10
+    report = enabled_profiler.report()["methods"]["online_score"]
+    assert report["stages"]["outer"]["peak"] >= 10 * 1024 * 1024
+    assert report["stages"]["inner"]["peak"] < 1024 * 1024
+    assert report["peak"] >= 10 * 1024 * 1024
+    assert len(small) == 10
+
+
+def test_profiled_requests_are_serialised(enabled_profiler):
+    done = threading.Event()
+
+    def other():
+        with enabled_profiler.request():
+            done.set()
+
+    with enabled_profiler.request():
+        thread = threading.Thread(target=other)
+        thread.start()
+        assert not done.wait(0.05)
+    thread.join(1)
+    assert done.is_set()
@@ -0,0 +1,133 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import api
+from registry import MethodOverloaded, MethodRegistry, MethodTimeout, fan_out
+from tracing import REQUEST_ID
+
+
+@pytest.fixture
+def registry():
+    registry = MethodRegistry()
+    yield registry
+    registry.shutdown(wait=False)
+
+
+def test_parse_fills_schema_fields(registry):
+    spec = registry.register("interests", api.ClientsInterestsRequest, None)
+    request = spec.parse({"client_ids": [1, 2], "unknown": 1})
+    assert request.client_ids == [1, 2]
+    assert request.date is None
+
+
+def test_parse_validates_schema_fields(registry):
+    spec = registry.register("interests", api.ClientsInterestsRequest, None)
+    with pytest.raises(TypeError, match="^Field must be a list$"):
+        spec.parse({"client_ids": "1"})
+
+
+def test_schema_values_are_per_instance(registry):
+    spec = registry.register("interests", api.ClientsInterestsRequest, None)
+    first = spec.parse({"client_ids": [1]})
+    second = spec.parse({"client_ids": [2]})
+    assert first.client_ids == [1]
+    assert second.client_ids == [2]
+
+
+def test_submit_returns_handler_result(registry):
+    spec = registry.register("echo", api.ClientsInterestsRequest, lambda x: (x, 200))
+    assert spec.submit("ok") == ("ok", 200)
+    assert "echo" in registry
+
+
+def test_submit_rejects_over_max_concurrency(registry):
+    release = threading.Event()
+    spec = registry.register(
+        "slow", api.ClientsInterestsRequest, release.wait, workers=1, timeout=5
+    )
+    thread = threading.Thread(target=spec.submit, args=(5,))
+    thread.start()
+    while spec.slots.acquire(blocking=False):
+        spec.slots.release()
+    with pytest.raises(MethodOverloaded):
+        spec.submit(5)
+    release.set()
+    thread.join()
+
+
+def test_submit_timeout(registry):
+    release = threading.Event()
+    spec = registry.register(
+        "slow", api.ClientsInterestsRequest, release.wait, timeout=0.01
+    )
+    with pytest.raises(MethodTimeout):
+        spec.submit(5)
+    release.set()
+
+
+def test_submit_propagates_request_id(registry):
+    spec = registry.register("ctx", api.ClientsInterestsRequest, REQUEST_ID.get)
+    token = REQUEST_ID.set("req-1")
+    try:
+        assert spec.submit() == "req-1"
+    finally:
+        REQUEST_ID.reset(token)
+
+
+@pytest.fixture
+def executor():
+    executor = ThreadPoolExecutor(max_workers=8)
+    yield executor
+    executor.shutdown(wait=False, cancel_futures=True)
+
+
+def test_fan_out_keeps_input_order(executor):
+    def lookup(item):
+        time.sleep(0.01 * (5 - item))
+        return item * 10
+
+    assert fan_out(executor, lookup, range(5), width=5) == [0, 10, 20, 30, 40]
+
+
+def test_fan_out_respects_width(executor):
+    lock = threading.Lock()
+    running = []
+    peak = []
+
+    def lookup(item):
+        with lock:
+            running.append(item)
+            peak.append(len(running))
+        time.sleep(0.01)
+        with lock:
+            running.remove(item)
+        return item
+
+    assert fan_out(executor, lookup, range(10), width=2) == list(range(10))
+    assert max(peak) <= 2
+
+
+def test_fan_out_runs_lookups_concurrently(executor):
+    start = time.monotonic()
+    fan_out(executor, lambda _: time.sleep(0.1), range(8), width=8)
+    assert time.monotonic() - start < 0.5
+
+
+def test_fan_out_deadline(executor):
+    release = threading.Event()
+    with pytest.raises(MethodTimeout):
+        fan_out(executor, lambda _: release.wait(), range(3), width=3, timeout=0.05)
+    release.set()
+
+
+def test_fan_out_propagates_errors(executor):
+    def lookup(item):
+        if item == 2:
+            raise ConnectionError("store is down")
+        return item
+
+    with pytest.raises(ConnectionError, match="^store is down$"):
+        fan_out(executor, lookup, range(4), width=2)
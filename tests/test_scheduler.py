@@ -0,0 +1,148 @@
+import json
+import threading
+import time
+
+import pytest
+
+import api
+from scheduler import ADMIN, BULK, INTERACTIVE, PriorityScheduler
+from tests.helpers import make_request, post
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def depth(scheduler):
+    return sum(c["depth"] for c in scheduler.report()["classes"].values())
+
+
+def enqueue(scheduler, priority, order):
+    queued = depth(scheduler)
+
+    def run():
+        if scheduler.acquire(priority):
+            order.append(priority)
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    while depth(scheduler) == queued:
+        time.sleep(0.001)
+    return thread
+
+
+def drain(scheduler, threads, order):
+    for i, thread in enumerate(threads):
+        scheduler.release()
+        while len(order) <= i:
+            time.sleep(0.001)
+    for thread in threads:
+        thread.join(1)
+
+
+def test_classify():
+    scheduler = PriorityScheduler(1, account_classes={"batch": BULK})
+    assert scheduler.classify("online_score") == INTERACTIVE
+    assert scheduler.classify("clients_interests", "horns&hoofs") == BULK
+    assert scheduler.classify("clients_interests", admin=True) == ADMIN
+    assert scheduler.classify("online_score", "batch") == BULK
+    assert scheduler.classify("unknown") == INTERACTIVE
+
+
+def test_weighted_order():
+    scheduler = PriorityScheduler(1, starvation_age=60, clock=Clock())
+    assert scheduler.acquire(INTERACTIVE)
+    order, threads = [], []
+    for _ in range(6):
+        threads.append(enqueue(scheduler, BULK, order))
+        threads.append(enqueue(scheduler, INTERACTIVE, order))
+    drain(scheduler, threads, order)
+    assert order[:6].count(INTERACTIVE) == 5
+    assert order.count(BULK) == 6
+    report = scheduler.report()
+    assert report["classes"][BULK]["granted"] == 6
+    assert report["classes"][INTERACTIVE]["granted"] == 7
+
+
+def test_starved_waiter_goes_first():
+    clock = Clock()
+    scheduler = PriorityScheduler(1, starvation_age=1, clock=clock)
+    assert scheduler.acquire(INTERACTIVE)
+    order, threads = [], []
+    threads.append(enqueue(scheduler, BULK, order))
+    clock.now = 5
+    threads.extend(enqueue(scheduler, INTERACTIVE, order) for _ in range(3))
+    drain(scheduler, threads, order)
+    assert order[0] == BULK
+    report = scheduler.report()
+    assert report["starved"] == 1
+    assert report["classes"][BULK]["max_wait"] == 5
+
+
+def test_wait_timeout_rejects():
+    scheduler = PriorityScheduler(1, timeout=0.01)
+    assert scheduler.acquire(INTERACTIVE)
+    assert not scheduler.acquire(BULK)
+    report = scheduler.report()
+    assert report["in_flight"] == 1
+    assert report["classes"][BULK] == {
+        "weight": 1,
+        "depth": 0,
+        "granted": 0,
+        "rejected": 1,
+        "max_wait": 0.0,
+    }
+    scheduler.release()
+    assert scheduler.acquire(BULK)
+
+
+@pytest.fixture
+def scheduler(monkeypatch):
+    scheduler = PriorityScheduler(1, timeout=0.01)
+    monkeypatch.setattr(api, "SCHEDULER", scheduler)
+    return scheduler
+
+
+def test_server_sheds_when_queue_times_out(server, scheduler):
+    body = json.dumps(
+        make_request("online_score", {"first_name": "a", "last_name": "b"})
+    )
+    response, data = post(server, body)
+    assert json.loads(data)["code"] == api.OK
+    assert scheduler.report()["in_flight"] == 0
+
+    scheduler.acquire(INTERACTIVE)
+    response, data = post(server, body)
+    assert response.status == api.SERVICE_UNAVAILABLE
+    assert scheduler.report()["classes"][INTERACTIVE]["rejected"] == 1
+    scheduler.release()
+
+
+def test_scheduler_method(scheduler):
+    request = make_request("scheduler", {"action": "report"}, api.ADMIN_LOGIN)
+    response, code = api.method_handler({"body": request, "headers": {}}, {}, None)
+    assert code == api.OK
+    assert response["slots"] == 1
+
+    request = make_request("scheduler", {"action": "report"})
+    _, code = api.method_handler({"body": request, "headers": {}}, {}, None)
+    assert code == api.FORBIDDEN
+
+
+def test_unauthenticated_requests_are_not_scheduled(scheduler):
+    request = make_request("online_score", {"first_name": "a", "last_name": "b"})
+    request.update(login=api.ADMIN_LOGIN, token="bogus")
+    _, code = api.method_handler({"body": request, "headers": {}}, {}, None)
+    assert code == api.FORBIDDEN
+    assert all(c["granted"] == 0 for c in scheduler.report()["classes"].values())
+
+    request = make_request("online_score", {"first_name": "a", "last_name": "b"})
+    _, code = api.method_handler({"body": request, "headers": {}}, {}, None)
+    assert code == api.OK
+    report = scheduler.report()
+    assert report["classes"][INTERACTIVE]["granted"] == 1
+    assert report["in_flight"] == 0
@@ -1,6 +1,7 @@
 import pytest
 
-from scoring import get_interests, get_score, interests
+from scoring import get_interests, get_score, interests, score_key
+from store import Store
 
 
 @pytest.mark.parametrize(
@@ -101,3 +102,12 @@ def test_get_interests():
     assert isinstance(get_interests(None, None), list)
     assert len(get_interests(None, None)) == 2
     assert all(item in data for item in get_interests(None, None))
+
+
+def test_get_score_uses_store_cache():
+    store = Store()
+    assert get_score(store, "79123456789", None) == 1.5
+    key = score_key("79123456789", None)
+    assert store.cache_get(key) == 1.5
+    store.cache_set(key, 10)
+    assert get_score(store, "79123456789", None) == 10
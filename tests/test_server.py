@@ -0,0 +1,59 @@
+import gzip
+import json
+
+import api
+from tests.helpers import make_request, post
+
+
+def test_plain_request(server):
+    body = json.dumps(
+        make_request("online_score", {"first_name": "a", "last_name": "b"})
+    )
+    response, data = post(server, body)
+    assert response.status == api.OK
+    assert response.getheader("Content-Encoding") is None
+    assert json.loads(data) == {"response": {"score": 0.5}, "code": api.OK}
+
+
+def test_gzip_request_and_response(server, monkeypatch):
+    monkeypatch.setattr(api.MainHTTPHandler, "compress_min_size", 0)
+    body = json.dumps(make_request("clients_interests", {"client_ids": [1, 2, 3]}))
+    response, data = post(
+        server,
+        gzip.compress(body.encode("utf-8")),
+        {"Content-Encoding": "gzip", "Accept-Encoding": "gzip"},
+    )
+    assert response.status == api.OK
+    assert response.getheader("Content-Encoding") == "gzip"
+    assert len(json.loads(gzip.decompress(data))["response"]) == 3
+
+
+def test_bad_content_encoding(server):
+    body = json.dumps(
+        make_request("online_score", {"first_name": "a", "last_name": "b"})
+    )
+    response, _ = post(server, body, {"Content-Encoding": "gzip"})
+    assert response.status == api.BAD_REQUEST
+
+
+def test_request_id_header_and_spans(server, trace_path):
+    body = json.dumps(
+        make_request("online_score", {"first_name": "a", "last_name": "b"})
+    )
+    response, _ = post(server, body, {"X-Request-Id": "req-1"})
+    server.shutdown()
+    api.tracer.close()
+    assert response.getheader("X-Request-Id") == "req-1"
+    events = json.loads(trace_path.read_text().rstrip().rstrip(",") + "]")
+    assert [e["name"] for e in events] == [
+        "read_body",
+        "json_decode",
+        "parse",
+        "check_auth",
+        "validate",
+        "validate_arguments",
+        "online_score",
+        "encode",
+        "write",
+    ]
+    assert all(e["args"]["request_id"] == "req-1" for e in events)
@@ -0,0 +1,172 @@
+import hashlib
+import json
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import api
+from breaker import BreakerStore
+from registry import MethodTimeout
+from scoring import get_interests_many
+from sharding import ShardedStore
+from store import Store
+
+
+class CountingStore(Store):
+    def __init__(self):
+        super().__init__()
+        self.calls = []
+
+    def get(self, key):
+        self.calls.append(("get", [key]))
+        return super().get(key)
+
+    def get_many(self, keys):
+        self.calls.append(("get_many", list(keys)))
+        return super().get_many(keys)
+
+
+@pytest.fixture
+def nodes():
+    return {"node%s" % i: CountingStore() for i in range(3)}
+
+
+@pytest.fixture
+def sharded(nodes):
+    return ShardedStore(nodes, vnodes=50)
+
+
+def test_keys_are_spread_over_nodes(sharded):
+    owners = {sharded.node_name("i:%s" % i) for i in range(100)}
+    assert owners == {"node0", "node1", "node2"}
+
+
+def test_cache_goes_to_owning_node(sharded, nodes):
+    sharded.cache_set("uid:1", 3.5)
+    owner = nodes[sharded.node_name("uid:1")]
+    assert owner.cache_get("uid:1") == 3.5
+    assert sharded.cache_get("uid:1") == 3.5
+    others = [n for name, n in nodes.items() if n is not owner]
+    assert all(n.cache_get("uid:1") is None for n in others)
+
+
+def test_get_many_groups_keys_per_shard(sharded, nodes):
+    keys = ["i:%s" % i for i in range(30)]
+    for key in keys:
+        sharded.node(key).set(key, json.dumps([key]))
+    assert sharded.get_many(keys) == [json.dumps([key]) for key in keys]
+    for name, node in nodes.items():
+        owned = [key for key in keys if sharded.node_name(key) == name]
+        assert node.calls == [("get_many", owned)]
+
+
+class SlowStore(Store):
+    def __init__(self, started, release):
+        super().__init__()
+        self.started = started
+        self.release = release
+
+    def get_many(self, keys):
+        self.started.wait(1)
+        self.release.wait(1)
+        return super().get_many(keys)
+
+
+def test_get_many_fans_out_per_shard():
+    started, release = threading.Barrier(3), threading.Event()
+    nodes = {"node%s" % i: SlowStore(started, release) for i in range(3)}
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        sharded = ShardedStore(nodes, vnodes=50, executor=executor, timeout=5)
+        keys = ["i:%s" % i for i in range(30)]
+        for key in keys:
+            sharded.node(key).set(key, key)
+        release.set()
+        assert sharded.get_many(keys) == keys
+
+
+def test_get_many_deadline():
+    started, release = threading.Barrier(1), threading.Event()
+    nodes = {"node%s" % i: SlowStore(started, release) for i in range(3)}
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        sharded = ShardedStore(nodes, vnodes=50, executor=executor, timeout=0.05)
+        with pytest.raises(MethodTimeout):
+            sharded.get_many(["i:%s" % i for i in range(30)])
+        release.set()
+
+
+def test_adding_node_remaps_few_keys(sharded):
+    keys = ["i:%s" % i for i in range(2000)]
+    before = {key: sharded.node_name(key) for key in keys}
+    sharded.add_node("node3", Store())
+    moved = [key for key in keys if sharded.node_name(key) != before[key]]
+    assert all(sharded.node_name(key) == "node3" for key in moved)
+    assert 0.1 < len(moved) / len(keys) < 0.4
+
+
+def test_removing_node_remaps_only_its_keys(sharded):
+    keys = ["i:%s" % i for i in range(2000)]
+    before = {key: sharded.node_name(key) for key in keys}
+    sharded.remove_node("node1")
+    for key in keys:
+        if before[key] != "node1":
+            assert sharded.node_name(key) == before[key]
+        else:
+            assert sharded.node_name(key) != "node1"
+
+
+def test_lookups_survive_concurrent_membership_changes(sharded):
+    stop = threading.Event()
+
+    def churn():
+        while not stop.is_set():
+            sharded.add_node("node3", Store())
+            sharded.remove_node("node3")
+
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    thread = threading.Thread(target=churn, daemon=True)
+    thread.start()
+    keys = ["i:%s" % i for i in range(50)]
+    try:
+        for _ in range(200):
+            assert sharded.get_many(keys) == [None] * len(keys)
+            assert sharded.get("i:1") is None
+    finally:
+        stop.set()
+        thread.join(1)
+        sys.setswitchinterval(interval)
+
+
+def test_empty_ring():
+    with pytest.raises(LookupError, match="^No store nodes$"):
+        ShardedStore({}).get("i:1")
+
+
+def test_cache_set_many_per_shard(sharded, nodes):
+    items = [("uid:%s" % i, i, None) for i in range(20)]
+    sharded.cache_set_many(items)
+    for key, value, _ in items:
+        assert nodes[sharded.node_name(key)].cache_get(key) == value
+
+
+def test_interests_through_sharded_breaker_stores(sharded, nodes, monkeypatch):
+    monkeypatch.setattr(api, "INTERESTS_FROM_STORE", True)
+    store = ShardedStore({name: BreakerStore(node) for name, node in nodes.items()})
+    for cid in (1, 2, 3):
+        store.node("i:%s" % cid).store.set("i:%s" % cid, json.dumps(["cars", str(cid)]))
+    assert get_interests_many(store, [3, 1, 4]) == [["cars", "3"], ["cars", "1"], []]
+
+    request = {
+        "account": "horns&hoofs",
+        "login": "h&f",
+        "method": "clients_interests",
+        "arguments": {"client_ids": [1, 2, 2]},
+    }
+    request["token"] = hashlib.sha512(
+        (request["account"] + request["login"] + api.SALT).encode("utf-8")
+    ).hexdigest()
+    response, code = api.method_handler({"body": request, "headers": {}}, {}, store)
+    assert code == api.OK
+    assert response == {1: ["cars", "1"], 2: ["cars", "2"]}
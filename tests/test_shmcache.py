@@ -0,0 +1,74 @@
+import multiprocessing
+
+import pytest
+
+from shmcache import SharedCache, SharedCacheStore
+from store import Store
+
+
+@pytest.fixture
+def cache():
+    cache = SharedCache(slots=16, slot_size=256, ways=4, stripes=2)
+    yield cache
+    cache.close()
+
+
+def test_set_and_get(cache):
+    assert cache.get("uid:1") is None
+    assert cache.set("uid:1", 3.5)
+    assert cache.set("i:1", ["cars", "pets"])
+    assert cache.get("uid:1") == 3.5
+    assert cache.get("i:1") == ["cars", "pets"]
+
+
+def test_overwrite(cache):
+    cache.set("uid:1", 1)
+    cache.set("uid:1", 2)
+    assert cache.get("uid:1") == 2
+
+
+def test_expired_entry(cache, monkeypatch):
+    cache.set("uid:1", 1, ttl=10)
+    monkeypatch.setattr("shmcache.time.time", lambda: 10**12)
+    assert cache.get("uid:1") is None
+
+
+def test_value_too_large(cache):
+    assert not cache.set("i:1", "x" * 300)
+    assert cache.get("i:1") is None
+
+
+def test_evicts_least_recently_used():
+    cache = SharedCache(slots=2, slot_size=64, ways=2, stripes=1)
+    try:
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+        assert cache.get("a") == 1
+        assert cache.get("b") is None
+        assert cache.get("c") == 3
+    finally:
+        cache.close()
+
+
+def fill(cache):
+    cache.set("uid:child", 7)
+
+
+def test_shared_between_processes(cache):
+    process = multiprocessing.get_context("fork").Process(target=fill, args=(cache,))
+    process.start()
+    process.join()
+    assert cache.get("uid:child") == 7
+
+
+def test_shared_cache_store(cache):
+    store = Store()
+    store.set("i:1", '["cars"]')
+    wrapped = SharedCacheStore(store, cache)
+    assert wrapped.get("i:1") == '["cars"]'
+    assert cache.get("i:1") == '["cars"]'
+    wrapped.cache_set("uid:1", 2, 60)
+    assert store.cache_get("uid:1") == 2
+    assert cache.get("uid:1") == 2
@@ -0,0 +1,92 @@
+import os
+import stat
+import time
+
+import pytest
+
+import snapshot
+from shmcache import SharedCache
+
+
+@pytest.fixture
+def cache():
+    cache = SharedCache(slots=64, slot_size=256, ways=4, stripes=4)
+    yield cache
+    cache.close()
+
+
+@pytest.fixture
+def restarted():
+    cache = SharedCache(slots=64, slot_size=256, ways=4, stripes=4)
+    yield cache
+    cache.close()
+
+
+def test_save_and_load(cache, restarted, tmp_path):
+    path = str(tmp_path / "cache.snapshot")
+    cache.set("uid:1", 3.5, ttl=60)
+    cache.set("i:1", ["cars", "pets"])
+    assert snapshot.save(cache, path) == 2
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o600
+    assert snapshot.load(restarted, path) == 2
+    assert restarted.get("uid:1") == 3.5
+    assert restarted.get("i:1") == ["cars", "pets"]
+    assert os.listdir(tmp_path) == ["cache.snapshot"]
+
+
+def test_save_failure_leaves_no_temp_file(tmp_path):
+    class Broken:
+        def items(self):
+            raise OSError("boom")
+
+    with pytest.raises(OSError):
+        snapshot.save(Broken(), str(tmp_path / "cache.snapshot"))
+    assert not os.listdir(tmp_path)
+
+
+def test_expired_entries_are_dropped(cache, restarted, tmp_path, monkeypatch):
+    path = str(tmp_path / "cache.snapshot")
+    cache.set("uid:1", 1, ttl=10)
+    cache.set("uid:2", 2)
+    snapshot.save(cache, path)
+    now = time.time()
+    monkeypatch.setattr("snapshot.time.time", lambda: now + 20)
+    assert snapshot.load(restarted, path) == 1
+    assert restarted.get("uid:2") == 2
+
+
+def test_load_missing_or_empty_file(restarted, tmp_path):
+    assert snapshot.load(restarted, str(tmp_path / "missing")) == 0
+    (tmp_path / "empty").write_bytes(b"")
+    assert snapshot.load(restarted, str(tmp_path / "empty")) == 0
+
+
+def test_load_rejects_foreign_file(restarted, tmp_path):
+    path = tmp_path / "other"
+    path.write_bytes(b"not a snapshot")
+    with pytest.raises(ValueError, match="^Not a cache snapshot"):
+        snapshot.load(restarted, str(path))
+
+
+def record(key, value, expires=0):
+    key_bytes, data = key.encode("utf-8"), value.encode("utf-8")
+    return snapshot.RECORD.pack(expires, len(key_bytes), len(data)) + key_bytes + data
+
+
+def test_load_stops_at_truncated_record(restarted, tmp_path):
+    path = tmp_path / "cache.snapshot"
+    path.write_bytes(
+        snapshot.MAGIC + record("uid:1", "1") + record("i:1", '["cars"]')[:-3]
+    )
+    assert snapshot.load(restarted, str(path)) == 1
+    assert restarted.get("uid:1") == 1
+    assert restarted.get("i:1") is None
+
+
+def test_snapshotter_saves_on_stop(cache, restarted, tmp_path):
+    path = str(tmp_path / "cache.snapshot")
+    snapshotter = snapshot.Snapshotter(cache, path, interval=3600).start()
+    cache.set("uid:1", 1)
+    assert snapshotter.stop() == 1
+    snapshot.load(restarted, path)
+    assert restarted.get("uid:1") == 1
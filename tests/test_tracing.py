@@ -0,0 +1,48 @@
+import json
+
+from store import Store
+from tracing import REQUEST_ID, TracedStore, Tracer, tracer
+
+
+def read_events(path):
+    text = path.read_text(encoding="utf-8")
+    assert text.startswith("[\n")
+    return json.loads(text.rstrip().rstrip(",") + "]")
+
+
+def test_disabled_tracer_writes_nothing(tmp_path):
+    t = Tracer()
+    with t.span("stage"):
+        pass
+    assert not list(tmp_path.iterdir())
+
+
+def test_span_event_format(tmp_path):
+    path = tmp_path / "trace.json"
+    t = Tracer(str(path))
+    token = REQUEST_ID.set("abc")
+    with t.span("stage", method="online_score"):
+        pass
+    REQUEST_ID.reset(token)
+    with t.span("other"):
+        pass
+    t.close()
+    first, second = read_events(path)
+    assert first["name"] == "stage"
+    assert first["ph"] == "X"
+    assert first["dur"] >= 0
+    assert first["args"] == {"method": "online_score", "request_id": "abc"}
+    assert second["args"] == {"request_id": None}
+
+
+def test_traced_store(trace_path):
+    store = TracedStore(Store())
+    store.cache_set("uid:1", 1)
+    assert store.cache_get("uid:1") == 1
+    assert store.get("i:1") is None
+    tracer.close()
+    assert [e["name"] for e in read_events(trace_path)] == [
+        "store.cache_set",
+        "store.cache_get",
+        "store.get",
+    ]
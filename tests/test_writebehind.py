@@ -0,0 +1,98 @@
+import threading
+
+import pytest
+
+from store import Store
+from writebehind import (
+    BLOCK,
+    DROP_NEWEST,
+    DROP_OLDEST,
+    WRITE_THROUGH,
+    WriteBehindCache,
+)
+
+
+class RecordingStore(Store):
+    def __init__(self):
+        super().__init__()
+        self.batches = []
+
+    def cache_set_many(self, items):
+        self.batches.append(list(items))
+        super().cache_set_many(items)
+
+
+def test_cache_set_is_deferred_until_flush():
+    store = RecordingStore()
+    cache = WriteBehindCache(store, batch_size=2)
+    cache.cache_set("a", 1, 60)
+    assert store.cache_get("a") is None
+    assert cache.cache_get("a") == 1
+    cache.cache_set("b", 2)
+    cache.cache_set("c", 3)
+    cache.flush()
+    assert store.batches == [[("a", 1, 60), ("b", 2, None)], [("c", 3, None)]]
+    assert store.cache_get("c") == 3
+
+
+def test_same_key_is_coalesced():
+    store = RecordingStore()
+    cache = WriteBehindCache(store)
+    cache.cache_set("a", 1)
+    cache.cache_set("a", 2)
+    cache.flush()
+    assert store.batches == [[("a", 2, None)]]
+
+
+@pytest.mark.parametrize(
+    "overflow, stored, pending",
+    [
+        (DROP_OLDEST, {}, ["b", "c"]),
+        (DROP_NEWEST, {}, ["a", "b"]),
+        (WRITE_THROUGH, {"c": 3}, ["a", "b"]),
+    ],
+)
+def test_overflow_policy(overflow, stored, pending):
+    store = Store()
+    cache = WriteBehindCache(store, max_pending=2, overflow=overflow)
+    cache.cache_set("a", 1)
+    cache.cache_set("b", 2)
+    cache.cache_set("c", 3)
+    assert {k: v for k, (v, _) in store.cache.items()} == stored
+    assert list(cache.pending) == pending
+
+
+def test_block_overflow_waits_for_flush():
+    store = Store()
+    cache = WriteBehindCache(store, max_pending=1, flush_interval=0.01, overflow=BLOCK)
+    cache.start()
+    cache.cache_set("a", 1)
+    cache.cache_set("b", 2)
+    cache.close()
+    assert store.cache_get("a") == 1
+    assert store.cache_get("b") == 2
+
+
+def test_unknown_overflow_policy():
+    with pytest.raises(ValueError, match="^Unknown overflow policy: x$"):
+        WriteBehindCache(Store(), overflow="x")
+
+
+def test_background_flush_and_close():
+    store = Store()
+    cache = WriteBehindCache(store, batch_size=1, flush_interval=10).start()
+    flushed = threading.Event()
+    original = store.cache_set_many
+
+    def cache_set_many(items):
+        original(items)
+        flushed.set()
+
+    store.cache_set_many = cache_set_many
+    cache.cache_set("a", 1)
+    assert flushed.wait(5)
+    cache.cache_set("b", 2)
+    cache.close()
+    assert store.cache_get("b") == 2
+    cache.cache_set("c", 3)
+    assert store.cache_get("c") == 3
@@ -0,0 +1,95 @@
+import contextvars
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from memprof import profiler
+
+REQUEST_ID = contextvars.ContextVar("request_id", default=None)
+
+
+class Tracer:
+    def __init__(self, path=None):
+        self.path = path
+        self.file = None
+        self.lock = threading.Lock()
+
+    def configure(self, path):
+        self.close()
+        self.path = path
+
+    @contextmanager
+    def span(self, name, **args):
+        if self.path is None:
+            yield
+            return
+        ts = time.time_ns() // 1000
+        start = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            self.emit(name, ts, (time.perf_counter_ns() - start) // 1000, args)
+
+    def emit(self, name, ts, dur, args):
+        event = {
+            "name": name,
+            "cat": "api",
+            "ph": "X",
+            "ts": ts,
+            "dur": dur,
+            "pid": os.getpid(),
+            "tid": threading.get_ident(),
+            "args": dict(args, request_id=REQUEST_ID.get()),
+        }
+        line = json.dumps(event) + ",\n"
+        with self.lock:
+            if self.file is None:
+                # pylint: disable-next=consider-using-with
+                self.file = open(self.path, "a", buffering=1, encoding="utf-8")
+                if self.file.tell() == 0:
+                    self.file.write("[\n")
+            self.file.write(line)
+
+    def close(self):
+        with self.lock:
+            if self.file is not None:
+                self.file.close()
+                self.file = None
+
+
+tracer = Tracer()
+
+
+@contextmanager
+def profiled_span(name, args):
+    with profiler.stage(name), tracer.span(name, **args):
+        yield
+
+
+def span(name, **args):
+    if profiler.enabled:
+        return profiled_span(name, args)
+    return tracer.span(name, **args)
+
+
+class TracedStore:
+    def __init__(self, store):
+        self.store = store
+
+    def get(self, key):
+        with span("store.get", key=key):
+            return self.store.get(key)
+
+    def get_many(self, keys):
+        with span("store.get_many", keys=len(keys)):
+            return self.store.get_many(keys)
+
+    def cache_get(self, key):
+        with span("store.cache_get", key=key):
+            return self.store.cache_get(key)
+
+    def cache_set(self, key, value, ttl=None):
+        with span("store.cache_set", key=key):
+            return self.store.cache_set(key, value, ttl)
@@ -0,0 +1,124 @@
+import logging
+import threading
+from collections import OrderedDict
+
+DROP_OLDEST = "drop_oldest"
+DROP_NEWEST = "drop_newest"
+WRITE_THROUGH = "write_through"
+BLOCK = "block"
+OVERFLOW_POLICIES = (DROP_OLDEST, DROP_NEWEST, WRITE_THROUGH, BLOCK)
+
+
+class WriteBehindCache:  # pylint: disable=too-many-instance-attributes
+    def __init__(
+        self,
+        store,
+        max_pending=10000,
+        batch_size=100,
+        flush_interval=0.5,
+        overflow=DROP_OLDEST,
+    ):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError("Unknown overflow policy: %s" % overflow)
+        self.store = store
+        self.max_pending = max_pending
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.overflow = overflow
+        self.pending = OrderedDict()
+        self.dropped = 0
+        self.closed = False
+        self.cond = threading.Condition()
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(
+            target=self._run, name="write-behind", daemon=True
+        )
+        self.thread.start()
+        return self
+
+    def get(self, key):
+        return self.store.get(key)
+
+    def get_many(self, keys):
+        return self.store.get_many(keys)
+
+    def cache_get(self, key):
+        with self.cond:
+            if key in self.pending:
+                return self.pending[key][0]
+        return self.store.cache_get(key)
+
+    def cache_set(self, key, value, ttl=None):
+        with self.cond:
+            if self.closed:
+                write_now = True
+            elif key in self.pending or len(self.pending) < self.max_pending:
+                write_now = False
+            elif self.overflow == DROP_NEWEST:
+                self.dropped += 1
+                return
+            elif self.overflow == DROP_OLDEST:
+                self.pending.popitem(last=False)
+                self.dropped += 1
+                write_now = False
+            elif self.overflow == BLOCK:
+                self.cond.notify_all()
+                self.cond.wait_for(
+                    lambda: self.closed or len(self.pending) < self.max_pending
+                )
+                write_now = self.closed
+            else:
+                write_now = True
+            if not write_now:
+                self.pending.pop(key, None)
+                self.pending[key] = (value, ttl)
+                if len(self.pending) >= self.batch_size:
+                    self.cond.notify_all()
+                return
+        self.store.cache_set(key, value, ttl)
+
+    def _take_batch(self):
+        with self.cond:
+            batch = []
+            while self.pending and len(batch) < self.batch_size:
+                key, (value, ttl) = self.pending.popitem(last=False)
+                batch.append((key, value, ttl))
+            self.cond.notify_all()
+            return batch
+
+    def _write(self, batch):
+        try:
+            if hasattr(self.store, "cache_set_many"):
+                self.store.cache_set_many(batch)
+            else:
+                for key, value, ttl in batch:
+                    self.store.cache_set(key, value, ttl)
+        except Exception as e:
+            logging.exception("Write-behind flush failed: %s" % e)
+
+    def flush(self):
+        batch = self._take_batch()
+        while batch:
+            self._write(batch)
+            batch = self._take_batch()
+
+    def _run(self):
+        while True:
+            with self.cond:
+                if self.closed:
+                    return
+                self.cond.wait_for(
+                    lambda: self.closed or len(self.pending) >= self.batch_size,
+                    timeout=self.flush_interval,
+                )
+            self.flush()
+
+    def close(self):
+        with self.cond:
+            self.closed = True
+            self.cond.notify_all()
+        if self.thread is not None:
+            self.thread.join()
+        self.flush()